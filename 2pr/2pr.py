@@ -1,51 +1,18 @@
-from collections import Counter
+from bisect import bisect_left
+from itertools import accumulate
 import math
-import csv
-
-
-class FileManager:
-    def load_text(self, path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def write_text(self, path, text):
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(text)
-
-    def save_char_stats(self, path, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Character', 'Frequency', 'Probability'])
-            for ch, cnt in counts.most_common():
-                w.writerow([ch, cnt, f"{cnt}/{total}"])
-
-    def save_char_codes(self, path, codes, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Character', 'Probability', 'Code'])
-            for ch, code in codes.items():
-                w.writerow([ch, f"{counts[ch]}/{total}", code])
-
-    def save_pair_stats(self, path, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Pair', 'Frequency', 'Probability'])
-            for p, cnt in counts.most_common():
-                w.writerow([p, cnt, f"{cnt}/{total}"])
-
-    def save_pair_codes(self, path, codes, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Pair', 'Probability', 'Code'])
-            for p, code in codes.items():
-                w.writerow([p, f"{counts[p]}/{total}", code])
-
-
-class Fano:
-    def __init__(self, source_path='text.txt', file_manager=None):
-        self.source_path = source_path
-        self.io = file_manager if file_manager is not None else FileManager()
+import os
+import random
+import sys
+import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from prefix_coding import (FileManager, PrefixCoder, build_parser, check_args, run_command, run_source_command,
+                           split_symbols)
+
+
+class Fano(PrefixCoder):
     def build_codes(self, items, codes, prefix=""):
         n = len(items)
         if n == 1:
@@ -72,35 +39,78 @@ class Fano:
         self.build_codes(left, codes, prefix + '0')
         self.build_codes(right, codes, prefix + '1')
 
-    def bits_to_text(self, bits, decoding_map):
-        out = []
-        pos = 0
-        L = len(bits)
-        while pos < L:
-            for l in range(1, L - pos + 1):
-                seg = bits[pos:pos + l]
-                if seg in decoding_map:
-                    out.append(decoding_map[seg])
-                    pos += l
-                    break
-        return ''.join(out)
+    def build_codes_fast(self, items):
+        codes = {}
+        n = len(items)
+        if n == 0:
+            return codes
+        weights = [w for _, w in items]
+        stack = [(0, n, '')]
+        while stack:
+            lo, hi, prefix = stack.pop()
+            if hi - lo == 1:
+                codes[items[lo][0]] = prefix
+                continue
+            total = sum(weights[lo:hi])
+            cur = list(accumulate(weights[lo:hi - 1]))
+            i = min(bisect_left(cur, total, key=lambda v: 2 * v), len(cur) - 1)
+            while i > 0 and abs(total - 2 * cur[i - 1]) <= abs(total - 2 * cur[i]):
+                i -= 1
+            split = lo + i + 1
+            stack.append((split, hi, prefix + '1'))
+            stack.append((lo, split, prefix + '0'))
+        return codes
+
+    def benchmark_build_codes(self, n_symbols=100000, seed=1):
+        rng = random.Random(seed)
+        skewed_head = min(n_symbols, 1020)
+        distributions = {
+            'uniform': sorted((rng.randint(1, 1000) for _ in range(n_symbols)), reverse=True),
+            'zipf': [10 ** 9 // (i + 1) for i in range(n_symbols)],
+            'skewed': [2.0 ** (skewed_head - i) for i in range(skewed_head)],
+        }
+        results = {}
+        for name, weights in distributions.items():
+            items = [(f's{i}', w) for i, w in enumerate(weights)]
+            t0 = time.perf_counter()
+            fast = self.build_codes_fast(items)
+            fast_time = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            try:
+                reference = {}
+                self.build_codes(items, reference)
+                ref_time = time.perf_counter() - t0
+                same = reference == fast
+            except RecursionError:
+                ref_time = None
+                same = None
+            results[name] = {'fast': fast_time, 'reference': ref_time, 'same': same}
+            ref_text = f"{ref_time:.3f} с" if ref_time is not None else f"RecursionError (лимит {sys.getrecursionlimit()})"
+            print(f"{name}: {len(items)} символов, быстрый {fast_time:.3f} с, рекурсивный {ref_text}, "
+                  f"коды совпадают: {same}")
+        return results
+
+    def make_codes(self, freq, total):
+        return self.build_codes_fast([(sym, cnt / total) for sym, cnt in freq.most_common()])
+
+    def cache_tag(self):
+        return 'fano'
 
     def run(self):
-        text = self.io.load_text(self.source_path)
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('load', source_bytes):
+            text = self.io.load_text(self.source_path)
         n_chars = len(text)
         print(f"Количество символов в тексте: {n_chars}\n")
 
-        char_freq = Counter(text)
+        char_freq, pair_freq, char_codes, pair_codes = self.build_tables(text)
         distinct_chars = len(char_freq)
-        sorted_chars = char_freq.most_common()
-        char_list = [c for c, _ in sorted_chars]
-        freq_list = [f for _, f in sorted_chars]
-        prob_list = [f / n_chars for f in freq_list]
 
-        self.io.save_char_stats('char_stats.csv', char_freq, n_chars)
+        with self.phase('write_csv', path='char_stats.csv'):
+            self.io.save_char_stats('char_stats.csv', char_freq, n_chars)
         print("Статистика символов записана в char_stats.csv")
 
-        H1 = -sum(p * math.log2(p) for p in prob_list if p > 0)
+        H1 = self.entropy(char_freq, n_chars)
         print(f"Энтропия = {H1} бит на символ")
 
         uniform_len = math.ceil(math.log2(distinct_chars)) if distinct_chars > 1 else 1
@@ -108,49 +118,37 @@ class Fano:
         print(f"Избыточность при равномерном кодировании: {uniform_len - H1} бит на символ")
         print()
 
-        char_probs = [(ch, p) for ch, p in zip(char_list, prob_list)]
-        char_codes = {}
-        self.build_codes(char_probs, char_codes)
-
-        self.io.save_char_codes('char_codes.csv', char_codes, char_freq, n_chars)
+        with self.phase('write_csv', path='char_codes.csv'):
+            self.io.save_char_codes('char_codes.csv', char_codes, char_freq, n_chars)
         print("Коды символов записаны в char_codes.csv")
 
-        encoded_chars = ''.join(char_codes[ch] for ch in text)
-        print(f"Текст закодирован символами. Длина битовой последовательности: {len(encoded_chars)} бит")
-        self.io.write_text('encoded_chars.txt', encoded_chars)
-        print("Закодированный текст сохранен в encoded_chars.txt")
+        with self.phase('encode', source_bytes, symbols='chars'):
+            if self.verify == 'crc':
+                encoded_chars_bits = self.io.encode_indexed('encoded_chars.bin', text, char_codes, n_chars)
+            else:
+                data, encoded_chars_bits = self.pack_text(text, char_codes)
+                self.io.save_encoded('encoded_chars.bin', char_codes, data, encoded_chars_bits, n_chars)
+        print(f"Текст закодирован символами. Длина битовой последовательности: {encoded_chars_bits} бит")
+        print(f"Закодированный текст сохранен в encoded_chars.bin ({os.path.getsize('encoded_chars.bin')} байт)")
         print()
 
-        code_to_char = {c: ch for ch, c in char_codes.items()}
-        decoded = self.bits_to_text(encoded_chars, code_to_char)
-        print("Декодирование символов завершено успешно.")
-        self.io.write_text('decoded_chars.txt', decoded)
-        print("Декодированный текст сохранен в decoded_chars.txt")
-        if decoded == text:
-            print("Декодированный текст идентичен исходному.")
-        else:
-            print("Ошибка: декодированный текст отличается от исходного!")
+        self.check_encoded('encoded_chars.bin', 'decoded_chars.txt', text, "символов")
 
-        avg_char_code_length = sum(prob_list[i] * len(char_codes[ch]) for i, ch in enumerate(char_list))
+        avg_char_code_length = self.average_length(char_freq, char_codes, n_chars)
         char_eff = H1 / avg_char_code_length
         print(f"\nСредняя длина кода для символов: {avg_char_code_length}")
         print(f"Эффективность кодирования символов: {char_eff}")
 
-        pairs = [text[i:i + 2] for i in range(len(text) - 1)]
-
-        pair_freq = Counter(pairs)
-        total_pairs = len(pairs)
+        total_pairs = max(n_chars - 1, 0)
         distinct_pairs = len(pair_freq)
-        sorted_pairs = pair_freq.most_common()
-        pair_list = [p for p, _ in sorted_pairs]
-        pair_prob_list = [cnt / total_pairs for _, cnt in sorted_pairs]
 
         print(f"Общее количество пар: {total_pairs}, уникальных пар: {distinct_pairs}\n")
 
-        self.io.save_pair_stats('pair_stats.csv', pair_freq, total_pairs)
+        with self.phase('write_csv', path='pair_stats.csv'):
+            self.io.save_pair_stats('pair_stats.csv', pair_freq, total_pairs)
         print("Статистика пар символов записана в pair_stats.csv")
 
-        H_pair = -sum(p * math.log2(p) for p in pair_prob_list if p > 0)
+        H_pair = self.entropy(pair_freq, total_pairs)
         print(f"Энтропия на пару символов: {H_pair} бит на пару")
         print(f"Энтропия на символ: {H_pair / 2} бит на символ")
 
@@ -158,44 +156,29 @@ class Fano:
         print(f"Длина равномерного кода для пар: {uniform_pair_len} бит на пару")
         print()
 
-        pair_probs = [(p, prob) for p, prob in zip(pair_list, pair_prob_list)]
-        pair_codes = {}
-        self.build_codes(pair_probs, pair_codes)
-
-        self.io.save_pair_codes('pair_codes.csv', pair_codes, pair_freq, total_pairs)
+        with self.phase('write_csv', path='pair_codes.csv'):
+            self.io.save_pair_codes('pair_codes.csv', pair_codes, pair_freq, total_pairs)
         print("Коды пар символов записаны в pair_codes.csv")
 
-        encoded_pairs = ""
-        remaining = ""
-        i = 0
-        while i < len(text) - 1:
-            cur_pair = text[i:i + 2]
-            if cur_pair in pair_codes:
-                encoded_pairs += pair_codes[cur_pair]
+        pair_count = len(text) // 2
+        remaining = text[pair_count * 2:]
+        with self.phase('encode', source_bytes, symbols='pairs'):
+            if self.verify == 'crc':
+                encoded_pairs_bits = self.io.encode_indexed('encoded_pairs.bin', split_symbols(text, 2), pair_codes,
+                                                            pair_count, remaining)
             else:
-                raise ValueError(f"Пара {repr(cur_pair)} отсутствует в таблице кодов")
-            i += 2
-        if i < len(text):
-            remaining = text[i:]
-
-        print(f"Текст закодирован парами символов. Длина битовой последовательности: {len(encoded_pairs)} бит")
-        self.io.write_text('encoded_pairs.txt', encoded_pairs)
-        print("Закодированный текст сохранен в encoded_pairs.txt")
+                data, encoded_pairs_bits = self.pack_text(text, pair_codes, 2)
+                self.io.save_encoded('encoded_pairs.bin', pair_codes, data, encoded_pairs_bits,
+                                     pair_count, remaining)
+
+        print(f"Текст закодирован парами символов. Длина битовой последовательности: {encoded_pairs_bits} бит")
+        print(f"Закодированный текст сохранен в encoded_pairs.bin ({os.path.getsize('encoded_pairs.bin')} байт)")
         print()
 
-        code_to_pair = {c: p for p, c in pair_codes.items()}
-        decoded_pairs = self.bits_to_text(encoded_pairs, code_to_pair)
-        final_decoded = decoded_pairs + remaining
-        print("Декодирование пар символов завершено успешно.")
-        self.io.write_text('decoded_pairs.txt', final_decoded)
-        print("Декодированный текст сохранен в decoded_pairs.txt")
-        if final_decoded == text:
-            print("Декодированный текст идентичен исходному.")
-        else:
-            print("декодированный текст отличается от исходного")
+        self.check_encoded('encoded_pairs.bin', 'decoded_pairs.txt', text, "пар символов")
 
 
-        avg_pair_code_length = sum((pair_freq[p] / total_pairs) * len(pair_codes[p]) for p in pair_list)
+        avg_pair_code_length = self.average_length(pair_freq, pair_codes, total_pairs)
         avg_pair_per_char = avg_pair_code_length / 2
         print(f"\nСредняя длина кода для пар: {avg_pair_code_length} бит на пару")
         print(f"Средняя длина кода на символ: {avg_pair_per_char} бит на символ")
@@ -206,9 +189,9 @@ class Fano:
         print("Энтропия на символ:", H1,'/', H_pair / 2)
         print("Средняя длина кода:", avg_char_code_length,'/', avg_pair_per_char)
         print("Эффективность:", char_eff,'/', pair_eff)
-        print("Общая длина (бит):", len(encoded_chars),'/', len(encoded_pairs))
+        print("Общая длина (бит):", encoded_chars_bits,'/', encoded_pairs_bits)
 
-        compr_rate = len(encoded_chars) / len(encoded_pairs)
+        compr_rate = encoded_chars_bits / encoded_pairs_bits
         print(f"\nКоэффициент сжатия: {compr_rate}")
         if compr_rate > 1:
             print("Кодирование парами символов улучшило сжатие.")
@@ -216,6 +199,28 @@ class Fano:
             print("Кодирование парами символов не улучшило сжатие.")
 
 
+def make_codec(args, source_path, **options):
+    return Fano(source_path, FileManager(use_mmap=args.mmap), vectorized=args.vectorized, cache_dir=args.cache_dir,
+                **options)
+
+
+def main(argv=None):
+    parser, commands = build_parser('Кодирование Фано')
+    bench = commands.add_parser('benchmark-build', help='сравнение быстрого и рекурсивного построения кодов')
+    bench.add_argument('--symbols', type=int, default=100000, help='размер алфавита')
+    bench.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+
+    if args.command is None:
+        Fano().run()
+    elif args.command == 'benchmark-build':
+        Fano().benchmark_build_codes(args.symbols, args.seed)
+    elif args.command in ('encode', 'decode', 'stats'):
+        run_command(args, make_codec)
+    else:
+        run_source_command(args, make_codec)
+
+
 if __name__ == "__main__":
-    codec = Fano()
-    codec.run()
+    main()
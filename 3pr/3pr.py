@@ -1,53 +1,70 @@
-from collections import Counter
 import math
-import csv
+import os
 import heapq
-
-
-class FileManager:
-    def load_text(self, path):
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    def write_text(self, path, text):
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(text)
-
-    def save_char_stats(self, path, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Character', 'Frequency', 'Probability'])
-            for ch, cnt in counts.most_common():
-                w.writerow([ch, cnt, f"{cnt}/{total}"])
-
-    def save_char_codes(self, path, codes, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Character', 'Probability', 'Code'])
-            for ch, code in codes.items():
-                w.writerow([ch, f"{counts[ch]}/{total}", code])
-
-    def save_pair_stats(self, path, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Pair', 'Frequency', 'Probability'])
-            for p, cnt in counts.most_common():
-                w.writerow([p, cnt, f"{cnt}/{total}"])
-
-    def save_pair_codes(self, path, codes, counts: Counter, total):
-        with open(path, 'w', encoding='utf-8', newline='') as f:
-            w = csv.writer(f)
-            w.writerow(['Pair', 'Probability', 'Code'])
-            for p, code in codes.items():
-                w.writerow([p, f"{counts[p]}/{total}", code])
-
-
-class Huffman:
-    def __init__(self, source_path='text.txt', file_manager=None):
-        self.source_path = source_path
-        self.io = file_manager if file_manager is not None else FileManager()
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from prefix_coding import (FileManager, PrefixCoder, TableDecoder, assign_canonical_codes, build_parser, check_args,
+                           decode_job, encode_job, output_path, run_command, run_source_command, split_symbols)
+
+
+class Huffman(PrefixCoder):
+    def __init__(self, source_path='text.txt', file_manager=None, canonical=False, jobs=1, max_code_len=None,
+                 vectorized=False, cache_dir=None, verify='decode', metrics=None):
+        super().__init__(source_path, file_manager, jobs, vectorized, cache_dir, verify, metrics)
+        self.canonical = canonical or max_code_len is not None
+        self.max_code_len = max_code_len
+
+    def build_code_lengths(self, items):
+        n = len(items)
+        if n == 0:
+            return []
+        if n == 1:
+            return [(items[0][0], 0)]
+        heap = [(w, i) for i, (_, w) in enumerate(items)]
+        heapq.heapify(heap)
+        parent = [0] * (2 * n - 1)
+        node = n
+        while len(heap) > 1:
+            w1, a = heapq.heappop(heap)
+            w2, b = heapq.heappop(heap)
+            parent[a] = parent[b] = node
+            heapq.heappush(heap, (w1 + w2, node))
+            node += 1
+        depth = [0] * (2 * n - 1)
+        for i in range(2 * n - 3, -1, -1):
+            depth[i] = depth[parent[i]] + 1
+        return [(sym, depth[i]) for i, (sym, _) in enumerate(items)]
+
+    def build_limited_lengths(self, items, max_len):
+        n = len(items)
+        if n <= 1:
+            return self.build_code_lengths(items)
+        if (1 << max_len) < n:
+            raise ValueError(f"{n} символов нельзя закодировать кодами длиной не более {max_len} бит")
+        leaves = sorted(((w, i, ()) for i, (_, w) in enumerate(items)), key=lambda node: node[0])
+        current = leaves
+        for _ in range(max_len - 1):
+            packages = [(a[0] + b[0], -1, (a, b)) for a, b in zip(current[0::2], current[1::2])]
+            current = list(heapq.merge(leaves, packages, key=lambda node: node[0]))
+        lengths = [0] * n
+        stack = current[:2 * n - 2]
+        while stack:
+            _, leaf, children = stack.pop()
+            if leaf >= 0:
+                lengths[leaf] += 1
+            else:
+                stack.extend(children)
+        return [(sym, lengths[i]) for i, (sym, _) in enumerate(items)]
 
     def build_codes(self, items):
+        if self.max_code_len is not None:
+            return assign_canonical_codes(self.build_limited_lengths(items, self.max_code_len))
+        if self.canonical:
+            return assign_canonical_codes(self.build_code_lengths(items))
         pq = [[w, [sym, ""]] for sym, w in items]
         heapq.heapify(pq)
         if not pq:
@@ -64,36 +81,62 @@ class Huffman:
         result = {item[0]: item[1] for item in pq[0][1:]}
         return result
 
-    def bits_to_text(self, bits, decoding_map):
-        out = []
-        pos = 0
-        L = len(bits)
-        while pos < L:
-            for l in range(1, L - pos + 1):
-                seg = bits[pos:pos + l]
-                if seg in decoding_map:
-                    out.append(decoding_map[seg])
-                    pos += l
-                    break
-        return ''.join(out)
+    def make_codes(self, freq, total):
+        return self.build_codes([(sym, cnt / total) for sym, cnt in freq.most_common()])
 
-    def run(self):
+    def cache_tag(self):
+        if self.max_code_len is not None:
+            return f'huffman-limited{self.max_code_len}'
+        return 'huffman-canonical' if self.canonical else 'huffman'
+
+    def compare_length_limits(self, limits=(12, 15)):
         text = self.io.load_text(self.source_path)
+        results = {}
+        for name, order in (('символы', 1), ('пары', 2)):
+            freq = self.count_blocks(text, order)
+            n_blocks = sum(freq.values())
+            items = freq.most_common()
+            variants = [(None, self.build_code_lengths(items))]
+            print(f"\n{name}: {len(items)} уникальных")
+            for limit in limits:
+                if (1 << limit) >= len(items):
+                    variants.append((limit, self.build_limited_lengths(items, limit)))
+                else:
+                    print(f"предел {limit} бит слишком мал для {len(items)} символов")
+            print("предел | макс. длина | средняя длина | потеря сжатия | размер таблицы | МБ/с")
+            base_avg = None
+            for limit, lengths in variants:
+                codes = assign_canonical_codes(lengths)
+                avg_len = sum(freq[sym] * length for sym, length in lengths) / n_blocks
+                base_avg = avg_len if base_avg is None else base_avg
+                max_len = max(length for _, length in lengths)
+                data, nbits = self.pack_text(text, codes, order)
+                t0 = time.perf_counter()
+                decoder = TableDecoder(codes, index_bits=max_len)
+                decoded = decoder.decode_packed(data, nbits)
+                elapsed = time.perf_counter() - t0
+                speed = self.throughput(''.join(decoded), elapsed)
+                results[(name, limit)] = {'max_len': max_len, 'avg_len': avg_len, 'mb_per_s': speed}
+                print(f"{limit or '-'} | {max_len} | {avg_len:.4f} | {(avg_len / base_avg - 1) * 100:.3f}% | "
+                      f"{1 << max_len} | {speed:.2f}")
+        return results
+
+    def run(self):
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('load', source_bytes):
+            text = self.io.load_text(self.source_path)
 
         n_chars = len(text)
         print(f"Количество символов в тексте: {n_chars}\n")
 
-        char_freq = Counter(text)
+        char_freq, pair_freq, char_codes, pair_codes = self.build_tables(text)
         distinct_chars = len(char_freq)
-        sorted_chars = char_freq.most_common()
-        char_list = [c for c, _ in sorted_chars]
-        freq_list = [f for _, f in sorted_chars]
-        prob_list = [f / n_chars for f in freq_list]
 
-        self.io.save_char_stats('char_stats.csv', char_freq, n_chars)
+        with self.phase('write_csv', path='char_stats.csv'):
+            self.io.save_char_stats('char_stats.csv', char_freq, n_chars)
         print("Статистика символов записана в char_stats.csv")
 
-        H1 = -sum(p * math.log2(p) for p in prob_list if p > 0)
+        H1 = self.entropy(char_freq, n_chars)
         print(f"Энтропия H₁ = {H1} бит на символ")
 
         uniform_len = math.ceil(math.log2(distinct_chars)) if distinct_chars > 1 else 1
@@ -102,48 +145,40 @@ class Huffman:
         print(f"Избыточность при равномерном кодировании: { uniform_len - H1} бит на символ")
         print()
 
-        char_probs = [(ch, p) for ch, p in zip(char_list, prob_list)]
-        char_codes = self.build_codes(char_probs)
-
-        self.io.save_char_codes('char_codes.csv', char_codes, char_freq, n_chars)
+        with self.phase('write_csv', path='char_codes.csv'):
+            self.io.save_char_codes('char_codes.csv', char_codes, char_freq, n_chars)
         print("Коды символов записаны в char_codes.csv")
 
-        encoded_chars = ''.join(char_codes[ch] for ch in text)
-        print(f"Текст закодирован символами. Длина битовой последовательности: {len(encoded_chars)} бит")
-        self.io.write_text('encoded_chars.txt', encoded_chars)
-        print("Закодированный текст сохранен в encoded_chars.txt")
+        with self.phase('encode', source_bytes, symbols='chars'):
+            if self.verify == 'crc':
+                encoded_chars_bits = self.io.encode_indexed('encoded_chars.bin', text, char_codes, n_chars,
+                                                            canonical=self.canonical)
+            else:
+                data, encoded_chars_bits = self.pack_text(text, char_codes)
+                self.io.save_encoded('encoded_chars.bin', char_codes, data, encoded_chars_bits, n_chars,
+                                     canonical=self.canonical)
+        print(f"Текст закодирован символами. Длина битовой последовательности: {encoded_chars_bits} бит")
+        print(f"Закодированный текст сохранен в encoded_chars.bin ({os.path.getsize('encoded_chars.bin')} байт)")
         print()
 
-        code_to_char = {c: ch for ch, c in char_codes.items()}
-        decoded = self.bits_to_text(encoded_chars, code_to_char)
-        print("Декодирование символов завершено успешно.")
-        self.io.write_text('decoded_chars.txt', decoded)
-        print("Декодированный текст сохранен в decoded_chars.txt")
-        if decoded == text:
-            print("Декодированный текст идентичен исходному.")
-        else:
-            print("Ошибка: декодированный текст отличается от исходного!")
+        self.check_encoded('encoded_chars.bin', 'decoded_chars.txt', text, "символов")
 
-        avg_char_code_length = sum(prob_list[i] * len(char_codes[ch]) for i, ch in enumerate(char_list))
+        avg_char_code_length = self.average_length(char_freq, char_codes, n_chars)
         char_eff = H1 / avg_char_code_length
         print(f"\nСредняя длина кода для символов: {avg_char_code_length}")
         print(f"Эффективность кодирования символов: {char_eff}")
         print()
 
-        pairs = [text[i:i + 2] for i in range(len(text) - 1)]
-        pair_freq = Counter(pairs)
-        total_pairs = len(pairs)
+        total_pairs = max(n_chars - 1, 0)
         distinct_pairs = len(pair_freq)
-        sorted_pairs = pair_freq.most_common()
-        pair_list = [p for p, _ in sorted_pairs]
-        pair_prob_list = [cnt / total_pairs for _, cnt in sorted_pairs]
 
         print(f"Общее количество пар: {total_pairs}, уникальных пар: {distinct_pairs}\n")
 
-        self.io.save_pair_stats('pair_stats.csv', pair_freq, total_pairs)
+        with self.phase('write_csv', path='pair_stats.csv'):
+            self.io.save_pair_stats('pair_stats.csv', pair_freq, total_pairs)
         print("Статистика пар символов записана в pair_stats.csv")
 
-        pair_entropy = -sum(p * math.log2(p) for p in pair_prob_list if p > 0)
+        pair_entropy = self.entropy(pair_freq, total_pairs)
         print(f"Энтропия на пару символов: {pair_entropy} бит на пару")
         print(f"Энтропия на символ: {pair_entropy / 2} бит на символ")
 
@@ -151,42 +186,28 @@ class Huffman:
         print(f"Длина равномерного кода для пар: {uniform_pair_len} бит на пару")
         print()
 
-        pair_probs = [(p, prob) for p, prob in zip(pair_list, pair_prob_list)]
-        pair_codes = self.build_codes(pair_probs)
-
-        self.io.save_pair_codes('pair_codes.csv', pair_codes, pair_freq, total_pairs)
+        with self.phase('write_csv', path='pair_codes.csv'):
+            self.io.save_pair_codes('pair_codes.csv', pair_codes, pair_freq, total_pairs)
         print("Коды пар символов записаны в pair_codes.csv")
 
-        encoded_pairs = ""
-        remaining = ""
-        i = 0
-        while i < len(text) - 1:
-            cur_pair = text[i:i + 2]
-            if cur_pair in pair_codes:
-                encoded_pairs += pair_codes[cur_pair]
+        pair_count = len(text) // 2
+        remaining = text[pair_count * 2:]
+        with self.phase('encode', source_bytes, symbols='pairs'):
+            if self.verify == 'crc':
+                encoded_pairs_bits = self.io.encode_indexed('encoded_pairs.bin', split_symbols(text, 2), pair_codes,
+                                                            pair_count, remaining, self.canonical)
             else:
-                raise ValueError(f"Пара {repr(cur_pair)} отсутствует в таблице кодов")
-            i += 2
-        if i < len(text):
-            remaining = text[i:]
-
-        print(f"Текст закодирован парами символов. Длина битовой последовательности: {len(encoded_pairs)} бит")
-        self.io.write_text('encoded_pairs.txt', encoded_pairs)
-        print("Закодированный текст сохранен в encoded_pairs.txt")
+                data, encoded_pairs_bits = self.pack_text(text, pair_codes, 2)
+                self.io.save_encoded('encoded_pairs.bin', pair_codes, data, encoded_pairs_bits,
+                                     pair_count, remaining, self.canonical)
+
+        print(f"Текст закодирован парами символов. Длина битовой последовательности: {encoded_pairs_bits} бит")
+        print(f"Закодированный текст сохранен в encoded_pairs.bin ({os.path.getsize('encoded_pairs.bin')} байт)")
         print()
 
-        code_to_pair = {c: p for p, c in pair_codes.items()}
-        decoded_pairs = self.bits_to_text(encoded_pairs, code_to_pair)
-        final_decoded = decoded_pairs + remaining
-        print("Декодирование пар символов завершено успешно.")
-        self.io.write_text('decoded_pairs.txt', final_decoded)
-        print("Декодированный текст сохранен в decoded_pairs.txt")
-        if final_decoded == text:
-            print("Декодированный текст идентичен исходному.")
-        else:
-            print("декодированный текст отличается от исходного")
+        self.check_encoded('encoded_pairs.bin', 'decoded_pairs.txt', text, "пар символов")
 
-        avg_pair_code_length = sum((pair_freq[p] / total_pairs) * len(pair_codes[p]) for p in pair_list)
+        avg_pair_code_length = self.average_length(pair_freq, pair_codes, total_pairs)
         avg_pair_length_per_char = avg_pair_code_length / 2
         print(f"Средняя длина кода для пар: {avg_pair_code_length} бит на пару")
         print(f"Средняя длина кода на символ: {avg_pair_length_per_char} бит на символ")
@@ -197,9 +218,9 @@ class Huffman:
         print("Энтропия на символ:", H1, '/', pair_entropy / 2)
         print("Средняя длина кода:", avg_char_code_length,'/', avg_pair_length_per_char)
         print("Эффективность:", char_eff,'/', pair_efficiency)
-        print("Общая длина (бит):", len(encoded_chars),'/', len(encoded_pairs))
+        print("Общая длина (бит):", encoded_chars_bits,'/', encoded_pairs_bits)
 
-        compr_rate = len(encoded_chars) / len(encoded_pairs)
+        compr_rate = encoded_chars_bits / encoded_pairs_bits
         print(f"\nКоэффициент сжатия: {compr_rate:.2f}")
         if compr_rate > 1:
             print("Кодирование парами символов улучшило сжатие.")
@@ -207,6 +228,596 @@ class Huffman:
             print("Кодирование парами символов не улучшило сжатие.")
 
 
+def scale_frequencies(freq, total, precision=16):
+    items = freq.most_common()
+    if not items:
+        return [], []
+    bits = precision
+    while (1 << bits) < 4 * len(items) and bits < 22:
+        bits += 1
+    scale = 1 << bits
+    if len(items) > scale:
+        raise ValueError(f"Алфавит из {len(items)} символов не помещается в точность {bits} бит")
+    scaled = [max(1, cnt * scale // total) for _, cnt in items]
+    diff = scale - sum(scaled)
+    i = 0
+    while diff < 0:
+        take = min(-diff, scaled[i] - 1)
+        scaled[i] -= take
+        diff += take
+        i += 1
+    scaled[0] += diff
+    return [sym for sym, _ in items], scaled
+
+
+def build_frequency_model(symbols, freqs):
+    cum = [0]
+    for f in freqs:
+        cum.append(cum[-1] + f)
+    lookup = []
+    for i, f in enumerate(freqs):
+        lookup.extend([i] * f)
+    index = {sym: i for i, sym in enumerate(symbols)}
+    return {'symbols': symbols, 'freqs': freqs, 'cum': cum, 'total': cum[-1],
+            'lookup': lookup, 'index': index}
+
+
+def write_frequency_model(f, model, tail=''):
+    f.write(struct.pack('>I', len(model['symbols'])))
+    for sym, freq in zip(model['symbols'], model['freqs']):
+        raw = sym.encode('utf-8')
+        f.write(struct.pack('>HI', len(raw), freq))
+        f.write(raw)
+    raw = tail.encode('utf-8')
+    f.write(struct.pack('>H', len(raw)))
+    f.write(raw)
+
+
+def read_frequency_model(f):
+    (n_model,) = struct.unpack('>I', f.read(4))
+    symbols = []
+    freqs = []
+    for _ in range(n_model):
+        sym_len, freq = struct.unpack('>HI', f.read(6))
+        symbols.append(f.read(sym_len).decode('utf-8'))
+        freqs.append(freq)
+    (tail_len,) = struct.unpack('>H', f.read(2))
+    tail = f.read(tail_len).decode('utf-8')
+    return build_frequency_model(symbols, freqs), tail
+
+
+class RangeCoder:
+    TOP = 1 << 24
+    MASK = (1 << 32) - 1
+    MAGIC = b'DSKG'
+
+    def __init__(self, source_path='text.txt', file_manager=None, jobs=1, precision=16):
+        self.source_path = source_path
+        self.io = file_manager if file_manager is not None else FileManager()
+        self.precision = precision
+        self.huffman = Huffman(source_path, self.io, canonical=True, jobs=jobs)
+
+    def count_blocks(self, text, order):
+        return self.huffman.count_blocks(text, order)
+
+    def make_codes(self, freq, total):
+        return build_frequency_model(*scale_frequencies(freq, total, self.precision))
+
+    def encode_symbols(self, symbols, model):
+        index, freqs, cum, total = model['index'], model['freqs'], model['cum'], model['total']
+        top, mask = self.TOP, self.MASK
+        out = bytearray()
+        low = 0
+        rng = mask
+        cache = 0
+        cache_size = 1
+        for sym in symbols:
+            try:
+                s = index[sym]
+            except KeyError:
+                raise ValueError(f"Символ {sym!r} отсутствует в модели")
+            r = rng // total
+            low += r * cum[s]
+            rng = r * freqs[s]
+            while rng < top:
+                rng <<= 8
+                if low < 0xFF000000 or low > mask:
+                    carry = low >> 32
+                    out.append((cache + carry) & 0xFF)
+                    out.extend([(0xFF + carry) & 0xFF] * (cache_size - 1))
+                    cache_size = 0
+                    cache = (low >> 24) & 0xFF
+                cache_size += 1
+                low = (low << 8) & mask
+        for _ in range(5):
+            if low < 0xFF000000 or low > mask:
+                carry = low >> 32
+                out.append((cache + carry) & 0xFF)
+                out.extend([(0xFF + carry) & 0xFF] * (cache_size - 1))
+                cache_size = 0
+                cache = (low >> 24) & 0xFF
+            cache_size += 1
+            low = (low << 8) & mask
+        return bytes(out)
+
+    def decode_symbols(self, data, model, n_symbols):
+        symbols, freqs, cum, total, lookup = (model['symbols'], model['freqs'], model['cum'],
+                                              model['total'], model['lookup'])
+        top, mask = self.TOP, self.MASK
+        data = data + bytes(5)
+        code = int.from_bytes(data[:5], 'big')
+        pos = 5
+        rng = mask
+        out = []
+        append = out.append
+        for _ in range(n_symbols):
+            r = rng // total
+            value = code // r
+            s = lookup[value if value < total else total - 1]
+            append(symbols[s])
+            code -= r * cum[s]
+            rng = r * freqs[s]
+            while rng < top:
+                code = ((code << 8) | (data[pos] if pos < len(data) else 0)) & mask
+                pos += 1
+                rng <<= 8
+        return out
+
+    def pack_text(self, text, model, order=1):
+        data = self.encode_symbols(split_symbols(text, order), model)
+        return data, len(data) * 8
+
+    def unpack_text(self, data, model, n_symbols):
+        return self.decode_symbols(data, model, n_symbols)
+
+    def save_encoded(self, path, model, data, n_symbols, tail=''):
+        with open(path, 'wb') as f:
+            f.write(struct.pack('>4sQ', self.MAGIC, n_symbols))
+            write_frequency_model(f, model, tail)
+            f.write(data)
+
+    def load_encoded(self, path):
+        with open(path, 'rb') as f:
+            magic, n_symbols = struct.unpack('>4sQ', f.read(12))
+            if magic != self.MAGIC:
+                raise ValueError(f"Файл {path} не является потоком интервального кодера")
+            model, tail = read_frequency_model(f)
+            data = f.read()
+        return model, data, n_symbols, tail
+
+    def decode_file(self, path):
+        model, data, n_symbols, tail = self.load_encoded(path)
+        return ''.join(self.decode_symbols(data, model, n_symbols)) + tail
+
+    def run(self):
+        text = self.io.load_text(self.source_path)
+        n_chars = len(text)
+        print(f"Количество символов в тексте: {n_chars}\n")
+        print("k | энтропия/символ | интервальный бит/символ | Хаффман бит/символ | отрыв от энтропии | "
+              "кодирование МБ/с | декодирование МБ/с")
+        results = {}
+        for order in (1, 2):
+            path = f'encoded_range_k{order}.bin'
+            freq = self.count_blocks(text, order)
+            n_blocks = n_chars // order
+            tail = text[n_blocks * order:]
+            entropy = -sum(c / n_blocks * math.log2(c / n_blocks) for c in freq.values())
+
+            t0 = time.perf_counter()
+            model = self.make_codes(freq, n_blocks)
+            data, nbits = self.pack_text(text, model, order)
+            encode_time = time.perf_counter() - t0
+            self.save_encoded(path, model, data, n_blocks, tail)
+
+            t0 = time.perf_counter()
+            decoded = self.decode_file(path)
+            decode_time = time.perf_counter() - t0
+
+            huffman_bits = sum(freq[sym] * length for sym, length in
+                               self.huffman.build_code_lengths(freq.most_common()))
+            bits_per_char = nbits / n_chars if n_chars else 0.0
+            huffman_per_char = huffman_bits / n_chars if n_chars else 0.0
+            gap = (nbits / n_blocks / entropy - 1) * 100 if entropy else 0.0
+            results[order] = {'bits': nbits, 'huffman_bits': huffman_bits, 'entropy': entropy,
+                              'decoded_ok': decoded == text}
+            print(f"{order} | {entropy / order:.4f} | {bits_per_char:.4f} | {huffman_per_char:.4f} | "
+                  f"{gap:.3f}% | {self.huffman.throughput(text, encode_time):.2f} | "
+                  f"{self.huffman.throughput(text, decode_time):.2f}")
+            if decoded == text:
+                print(f"{path}: декодированный текст идентичен исходному.")
+            else:
+                print(f"{path}: ошибка, декодированный текст отличается от исходного!")
+        return results
+
+
+class RansCoder:
+    RANS_L = 1 << 23
+    MAGIC = b'DSKN'
+
+    def __init__(self, source_path='text.txt', file_manager=None, jobs=1, precision=16, streams=4):
+        self.source_path = source_path
+        self.io = file_manager if file_manager is not None else FileManager()
+        self.precision = precision
+        self.streams = streams
+        self.huffman = Huffman(source_path, self.io, canonical=True, jobs=jobs)
+
+    def count_blocks(self, text, order):
+        return self.huffman.count_blocks(text, order)
+
+    def make_codes(self, freq, total):
+        return build_frequency_model(*scale_frequencies(freq, total, self.precision))
+
+    def encode_symbols(self, symbols, model):
+        index, freqs, cum = model['index'], model['freqs'], model['cum']
+        scale_bits = model['total'].bit_length() - 1
+        try:
+            ids = [index[sym] for sym in symbols]
+        except KeyError as e:
+            raise ValueError(f"Символ {e.args[0]!r} отсутствует в модели")
+        if not ids:
+            return b''
+        n = self.streams
+        states = [self.RANS_L] * n
+        bound = (self.RANS_L >> scale_bits) << 8
+        out = bytearray()
+        for i in range(len(ids) - 1, -1, -1):
+            s = ids[i]
+            j = i % n
+            x = states[j]
+            f = freqs[s]
+            x_max = bound * f
+            while x >= x_max:
+                out.append(x & 0xFF)
+                x >>= 8
+            states[j] = ((x // f) << scale_bits) + (x % f) + cum[s]
+        for x in reversed(states):
+            out += x.to_bytes(4, 'little')
+        out.reverse()
+        return bytes(out)
+
+    def decode_symbols(self, data, model, n_symbols, streams):
+        symbols, freqs, cum, lookup = model['symbols'], model['freqs'], model['cum'], model['lookup']
+        scale_bits = model['total'].bit_length() - 1
+        mask = model['total'] - 1
+        low = self.RANS_L
+        n = streams
+        states = [int.from_bytes(data[4 * j:4 * j + 4], 'big') for j in range(n)]
+        pos = 4 * n
+        size = len(data)
+        out = []
+        append = out.append
+        for i in range(n_symbols):
+            j = i % n
+            x = states[j]
+            slot = x & mask
+            s = lookup[slot]
+            append(symbols[s])
+            x = freqs[s] * (x >> scale_bits) + slot - cum[s]
+            while x < low:
+                x = (x << 8) | (data[pos] if pos < size else 0)
+                pos += 1
+            states[j] = x
+        return out
+
+    def pack_text(self, text, model, order=1):
+        data = self.encode_symbols(split_symbols(text, order), model)
+        return data, len(data) * 8
+
+    def unpack_text(self, data, model, n_symbols):
+        return self.decode_symbols(data, model, n_symbols, self.streams)
+
+    def save_encoded(self, path, model, data, n_symbols, tail=''):
+        with open(path, 'wb') as f:
+            f.write(struct.pack('>4sQB', self.MAGIC, n_symbols, self.streams))
+            write_frequency_model(f, model, tail)
+            f.write(data)
+
+    def load_encoded(self, path):
+        with open(path, 'rb') as f:
+            magic, n_symbols, streams = struct.unpack('>4sQB', f.read(13))
+            if magic != self.MAGIC:
+                raise ValueError(f"Файл {path} не является потоком rANS")
+            model, tail = read_frequency_model(f)
+            data = f.read()
+        return model, data, n_symbols, tail, streams
+
+    def decode_file(self, path):
+        model, data, n_symbols, tail, streams = self.load_encoded(path)
+        return ''.join(self.decode_symbols(data, model, n_symbols, streams)) + tail
+
+    def run(self):
+        text = self.io.load_text(self.source_path)
+        n_chars = len(text)
+        range_coder = RangeCoder(self.source_path, self.io, precision=self.precision)
+        print(f"Количество символов в тексте: {n_chars}, потоков rANS: {self.streams}\n")
+        print("k | движок | бит/символ | кодирование МБ/с | декодирование МБ/с")
+        results = {}
+        for order in (1, 2):
+            freq = self.count_blocks(text, order)
+            n_blocks = n_chars // order
+            tail = text[n_blocks * order:]
+            huffman_codes = self.huffman.make_codes(freq, n_blocks)
+            engines = (('rans', self), ('range', range_coder), ('huffman', self.huffman))
+            for name, engine in engines:
+                model = huffman_codes if engine is self.huffman else engine.make_codes(freq, n_blocks)
+                t0 = time.perf_counter()
+                data, nbits = engine.pack_text(text, model, order)
+                encode_time = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                if engine is self.huffman:
+                    only = self.io.single_symbol(model)
+                    symbols = [only] * n_blocks if only is not None else TableDecoder(model).decode_packed(data, nbits)
+                else:
+                    symbols = engine.unpack_text(data, model, n_blocks)
+                decoded = ''.join(symbols) + tail
+                decode_time = time.perf_counter() - t0
+                results[(order, name)] = {'bits': nbits, 'decoded_ok': decoded == text}
+                print(f"{order} | {name} | {nbits / n_chars if n_chars else 0.0:.4f} | "
+                      f"{self.huffman.throughput(text, encode_time):.2f} | "
+                      f"{self.huffman.throughput(text, decode_time):.2f}"
+                      f"{'' if decoded == text else ' (ошибка декодирования)'}")
+        model = self.make_codes(self.count_blocks(text, 1), n_chars)
+        data, _ = self.pack_text(text, model)
+        self.save_encoded('encoded_rans.bin', model, data, n_chars)
+        if self.decode_file('encoded_rans.bin') == text:
+            print("encoded_rans.bin: декодированный текст идентичен исходному.")
+        else:
+            print("encoded_rans.bin: ошибка, декодированный текст отличается от исходного!")
+        return results
+
+
+class AdaptiveHuffman:
+    LITERAL_BITS = 21
+    EOF_LITERAL = (1 << 21) - 1
+
+    def __init__(self, source_path='text.txt', file_manager=None, chunk_size=1 << 16):
+        self.source_path = source_path
+        self.io = file_manager if file_manager is not None else FileManager()
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.weight = [0]
+        self.parent = [-1]
+        self.left = [-1]
+        self.right = [-1]
+        self.symbol = [None]
+        self.node_at = [0]
+        self.rank = [0]
+        self.leaf_of = {}
+        self.nyt = 0
+
+    def new_node(self, sym, parent):
+        node = len(self.weight)
+        self.weight.append(0)
+        self.parent.append(parent)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.symbol.append(sym)
+        self.rank.append(len(self.node_at))
+        self.node_at.append(node)
+        return node
+
+    def path(self, node):
+        bits = []
+        parent = self.parent
+        while parent[node] != -1:
+            p = parent[node]
+            bits.append('1' if self.right[p] == node else '0')
+            node = p
+        return ''.join(reversed(bits))
+
+    def swap(self, a, b):
+        pa, pb = self.parent[a], self.parent[b]
+        if pa == pb:
+            self.left[pa], self.right[pa] = self.right[pa], self.left[pa]
+        else:
+            if self.left[pa] == a:
+                self.left[pa] = b
+            else:
+                self.right[pa] = b
+            if self.left[pb] == b:
+                self.left[pb] = a
+            else:
+                self.right[pb] = a
+            self.parent[a], self.parent[b] = pb, pa
+        ra, rb = self.rank[a], self.rank[b]
+        self.node_at[ra], self.node_at[rb] = b, a
+        self.rank[a], self.rank[b] = rb, ra
+
+    def update(self, sym):
+        node = self.leaf_of.get(sym)
+        if node is None:
+            old = self.nyt
+            node = self.new_node(sym, old)
+            self.nyt = self.new_node(None, old)
+            self.left[old] = self.nyt
+            self.right[old] = node
+            self.leaf_of[sym] = node
+        weight, node_at, rank = self.weight, self.node_at, self.rank
+        while node != -1:
+            w = weight[node]
+            r = rank[node]
+            leader = node
+            while r > 0 and weight[node_at[r - 1]] == w:
+                r -= 1
+                leader = node_at[r]
+            if leader != node and leader != self.parent[node]:
+                self.swap(node, leader)
+            weight[node] += 1
+            node = self.parent[node]
+
+    def ranks_ordered(self):
+        weights = [self.weight[node] for node in self.node_at]
+        return all(a >= b for a, b in zip(weights, weights[1:]))
+
+    def encode_symbol(self, sym):
+        node = self.leaf_of.get(sym)
+        if node is not None:
+            bits = self.path(node)
+        else:
+            bits = self.path(self.nyt) + format(ord(sym), f'0{self.LITERAL_BITS}b')
+        self.update(sym)
+        return bits
+
+    def encode_stream(self, chunks):
+        self.reset()
+        carry = ''
+        for chunk in chunks:
+            bits = carry + ''.join([self.encode_symbol(sym) for sym in chunk])
+            whole = len(bits) - len(bits) % 8
+            if whole:
+                yield int(bits[:whole], 2).to_bytes(whole // 8, 'big')
+            carry = bits[whole:]
+        bits = carry + self.path(self.nyt) + format(self.EOF_LITERAL, f'0{self.LITERAL_BITS}b')
+        yield self.io.pack_bits(bits)
+
+    def decode_stream(self, chunks):
+        self.reset()
+        pending = ''
+        node = 0
+        for chunk in chunks:
+            bits = pending + (format(int.from_bytes(chunk, 'big'), f'0{len(chunk) * 8}b') if chunk else '')
+            out = []
+            pos = 0
+            n = len(bits)
+            while True:
+                if node == self.nyt:
+                    if n - pos < self.LITERAL_BITS:
+                        break
+                    value = int(bits[pos:pos + self.LITERAL_BITS], 2)
+                    pos += self.LITERAL_BITS
+                    if value == self.EOF_LITERAL:
+                        if out:
+                            yield ''.join(out)
+                        return
+                    sym = chr(value)
+                    out.append(sym)
+                    self.update(sym)
+                    node = 0
+                elif self.left[node] == -1:
+                    sym = self.symbol[node]
+                    out.append(sym)
+                    self.update(sym)
+                    node = 0
+                elif pos < n:
+                    node = self.right[node] if bits[pos] == '1' else self.left[node]
+                    pos += 1
+                else:
+                    break
+            pending = bits[pos:]
+            if out:
+                yield ''.join(out)
+        raise ValueError("Поток оборван: не найден маркер конца")
+
+    def encode_file(self, src_path, dst_path):
+        size = 0
+        with open(dst_path, 'wb') as f:
+            for data in self.encode_stream(self.io.iter_text(src_path, self.chunk_size)):
+                f.write(data)
+                size += len(data)
+        return size
+
+    def decode_file(self, src_path, dst_path):
+        with open(src_path, 'rb') as f, open(dst_path, 'w', encoding='utf-8', newline='') as out:
+            for text in self.decode_stream(iter(lambda: f.read(self.chunk_size), b'')):
+                out.write(text)
+
+    def run(self):
+        t0 = time.perf_counter()
+        size = self.encode_file(self.source_path, 'encoded_adaptive.bin')
+        encode_time = time.perf_counter() - t0
+        print(f"Адаптивное кодирование завершено: {size * 8} бит ({size} байт) в encoded_adaptive.bin")
+        if not self.ranks_ordered():
+            print("Ошибка: веса узлов дерева не убывают по рангу!")
+        t0 = time.perf_counter()
+        self.decode_file('encoded_adaptive.bin', 'decoded_adaptive.txt')
+        decode_time = time.perf_counter() - t0
+        print(f"Время кодирования: {encode_time:.3f} с, декодирования: {decode_time:.3f} с")
+        if self.io.files_equal('decoded_adaptive.txt', self.source_path):
+            print("Декодированный текст идентичен исходному.")
+        else:
+            print("Ошибка: декодированный текст отличается от исходного!")
+
+
+ENGINES = {'range': RangeCoder, 'rans': RansCoder}
+
+
+def make_codec(args, source_path, **options):
+    return Huffman(source_path, FileManager(use_mmap=args.mmap), canonical=args.canonical,
+                   max_code_len=args.max_code_len, vectorized=args.vectorized, cache_dir=args.cache_dir, **options)
+
+
+def encode_engine_job(job):
+    make_codec, args, src = job
+    if args.engine == 'huffman':
+        return encode_job(job)
+    io = FileManager(use_mmap=args.mmap)
+    dst = output_path(args, src, '.bin')
+    if args.engine == 'adaptive':
+        size = AdaptiveHuffman(src, io).encode_file(src, dst)
+        return src, dst, sum(len(chunk) for chunk in io.iter_text(src)), size * 8
+    coder = ENGINES[args.engine](src, io)
+    text = io.load_text(src)
+    n_symbols = len(text) // args.order
+    model = coder.make_codes(coder.count_blocks(text, args.order), n_symbols)
+    data, nbits = coder.pack_text(text, model, args.order)
+    coder.save_encoded(dst, model, data, n_symbols, text[n_symbols * args.order:])
+    return src, dst, len(text), nbits
+
+
+def decode_engine_job(job):
+    make_codec, args, src = job
+    io = FileManager()
+    dst = output_path(args, src, '.decoded.txt')
+    if args.engine == 'adaptive':
+        AdaptiveHuffman(src, io).decode_file(src, dst)
+        return src, dst, sum(len(chunk) for chunk in io.iter_text(dst))
+    with open(src, 'rb') as f:
+        magic = f.read(4)
+    for coder_class in ENGINES.values():
+        if magic == coder_class.MAGIC:
+            text = coder_class(src, io).decode_file(src)
+            io.write_text(dst, text)
+            return src, dst, len(text)
+    return decode_job(job)
+
+
+def main(argv=None):
+    parser, commands = build_parser('Кодирование Хаффмана', [('limits', 'сравнение ограничений длины кода')])
+    for name in ('encode', 'stats', 'run', 'orders', 'context', 'indexed', 'limits'):
+        sub = commands.choices[name]
+        sub.add_argument('--canonical', action='store_true', help='канонические коды')
+        sub.add_argument('--max-code-len', type=int, default=None, help='ограничение длины кода')
+    for name in ('encode', 'decode', 'run'):
+        commands.choices[name].add_argument('--engine', choices=('huffman', 'range', 'rans', 'adaptive'),
+                                            default='huffman', help='способ кодирования')
+    commands.choices['limits'].add_argument('--limits', type=int, nargs='+', default=[12, 15],
+                                            help='пределы длины кода в битах')
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    if getattr(args, 'engine', 'huffman') != 'huffman':
+        if getattr(args, 'streaming', False) or getattr(args, 'indexed', False):
+            parser.error("--streaming и --indexed поддерживаются только для --engine huffman")
+        if getattr(args, 'cache_dir', None) or getattr(args, 'vectorized', False):
+            parser.error("--cache-dir и --vectorized поддерживаются только для --engine huffman")
+        if args.command == 'run' and (args.verify != 'decode' or args.metrics or args.metrics_log or
+                                      args.trace_allocations):
+            parser.error("--verify и метрики поддерживаются только для --engine huffman")
+
+    if args.command is None:
+        Huffman().run()
+    elif args.command in ('encode', 'decode', 'stats'):
+        run_command(args, make_codec, encode_engine_job, decode_engine_job)
+    elif args.command == 'run' and args.engine == 'adaptive':
+        AdaptiveHuffman(args.source, FileManager(use_mmap=args.mmap)).run()
+    elif args.command == 'run' and args.engine != 'huffman':
+        ENGINES[args.engine](args.source, FileManager(use_mmap=args.mmap), jobs=args.jobs).run()
+    elif args.command == 'limits':
+        make_codec(args, args.source, jobs=args.jobs).compare_length_limits(tuple(args.limits))
+    else:
+        run_source_command(args, make_codec)
+
+
 if __name__ == "__main__":
-    codec = Huffman()
-    codec.run()
+    main()
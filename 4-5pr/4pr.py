@@ -1,4 +1,14 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
 import random
+import struct
+import sys
+import time
+
+from hamming import (benchmark_int, bits_to_int, build_G, decode_batch, encode_batch, encode_int, get_code,
+                     int_to_bits, is_power_of_two)
 
 def minimal_r_for_k(k):
     r = 1
@@ -8,17 +18,6 @@ def minimal_r_for_k(k):
             return r
         r += 1
 
-def is_power_of_two(x):
-    return x and (x & (x - 1)) == 0
-
-def build_H(r, n):
-    H = [[0] * n for _ in range(r)]
-    for col in range(n):
-        num = col + 1
-        for i in range(r):
-            H[i][col] = (num >> i) & 1
-    return H
-
 def print_H_rows(H):
     print("Матрица H:")
     for i, row in enumerate(H):
@@ -55,25 +54,10 @@ def calculate_parity_bits_via_H(code, H):
 
 def encode_hamming_via_H(info_bits, r):
     code = insert_info_bits_positions(info_bits, r)
-    H = build_H(r, len(code))
+    H = get_code(len(info_bits), r).H
     code = calculate_parity_bits_via_H(code, H)
     return code, H
 
-def build_G(k, r):
-    n = k + r
-    H = build_H(r, n)
-    info_positions = [pos for pos in range(1, n+1) if not is_power_of_two(pos)]
-    if len(info_positions) != k:
-        raise ValueError("Количество информационных позиций не равно k")
-    G = []
-    for j, pos in enumerate(info_positions):
-        row = [0] * n
-        row[pos-1] = 1
-        for i in range(r):
-            parity_pos = 2 ** i
-            row[parity_pos - 1] = H[i][pos-1]
-        G.append(row)
-    return G, info_positions
 def print_G(G):
     print("\nПорождающая матрица G:")
     for i, row in enumerate(G):
@@ -123,6 +107,143 @@ def correct_by_syndrome(received_n_bits, pos):
 def extract_info_bits_from_n(n_bits):
     return [str(n_bits[pos-1]) for pos in range(1, len(n_bits)+1) if not is_power_of_two(pos)]
 
+def benchmark_batch(k, r, batch=100000):
+    import numpy as np
+
+    code = get_code(k, r)
+    G, H, info_positions = code.G_array, code.H_array, code.info_positions
+    messages = np.random.randint(0, 2, size=(batch, k), dtype=np.uint8)
+    t0 = time.perf_counter()
+    codes = encode_batch(messages, G)
+    t1 = time.perf_counter()
+    errors = np.random.randint(0, k + r + 1, size=batch)
+    codes[np.arange(batch), errors] ^= 1
+    t2 = time.perf_counter()
+    info, status = decode_batch(codes, H, info_positions)
+    t3 = time.perf_counter()
+    if not (info == messages).all() or not (status == 1).all():
+        raise ValueError("Пакетный декодер вернул неверные данные")
+    return batch / (t1 - t0), batch / (t3 - t2)
+
+FILE_MAGIC = b'HMNG'
+FILE_HEADER = '>4sHHQ'
+
+def protect_file(src_path, dst_path, k, r=None, chunk_words=1 << 16):
+    import numpy as np
+
+    r = r or minimal_r_for_k(k)
+    code = get_code(k, r)
+    chunk_words -= chunk_words % 8
+    chunk_bytes = chunk_words * k // 8
+    size = 0
+    words = 0
+    t0 = time.perf_counter()
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        dst.write(struct.pack(FILE_HEADER, FILE_MAGIC, k, r, 0))
+        while True:
+            chunk = src.read(chunk_bytes)
+            if not chunk:
+                break
+            size += len(chunk)
+            bits = np.unpackbits(np.frombuffer(chunk, dtype=np.uint8), bitorder='little')
+            bits = np.concatenate([bits, np.zeros(-len(bits) % k, dtype=np.uint8)])
+            codes = code.encode_batch(bits.reshape(-1, k))
+            words += len(codes)
+            dst.write(np.packbits(codes.reshape(-1), bitorder='little').tobytes())
+        dst.seek(0)
+        dst.write(struct.pack(FILE_HEADER, FILE_MAGIC, k, r, size))
+    return size, words, time.perf_counter() - t0
+
+def restore_file(src_path, dst_path, chunk_words=1 << 16):
+    import numpy as np
+
+    chunk_words -= chunk_words % 8
+    stats = {'words': 0, 'corrected': 0, 'detected': 0}
+    t0 = time.perf_counter()
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        magic, k, r, size = struct.unpack(FILE_HEADER, src.read(struct.calcsize(FILE_HEADER)))
+        if magic != FILE_MAGIC:
+            raise ValueError(f"Файл {src_path} не защищён кодом Хэмминга")
+        code = get_code(k, r)
+        width = code.n + 1
+        remaining_words = -(-size * 8 // k)
+        remaining_bytes = size
+        while remaining_words:
+            count = min(chunk_words, remaining_words)
+            raw = src.read(-(-count * width // 8))
+            if len(raw) * 8 < count * width:
+                raise ValueError(f"Файл {src_path} оборван")
+            bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=count * width, bitorder='little')
+            info, status = code.decode_batch(bits.reshape(count, width))
+            stats['corrected'] += int((status == 1).sum())
+            stats['detected'] += int((status == 2).sum())
+            data = np.packbits(info.reshape(-1), bitorder='little')[:remaining_bytes].tobytes()
+            dst.write(data)
+            remaining_bytes -= len(data)
+            remaining_words -= count
+            stats['words'] += count
+    stats['size'] = size
+    stats['seconds'] = time.perf_counter() - t0
+    return stats
+
+def simulate_batch(args):
+    import numpy as np
+
+    k, r, p, trials, seed = args
+    code = get_code(k, r)
+    rng = np.random.default_rng(seed)
+    messages = rng.integers(0, 2, size=(trials, k), dtype=np.uint8)
+    errors = (rng.random((trials, code.n + 1)) < p).astype(np.uint8)
+    info, status = code.decode_batch(code.encode_batch(messages) ^ errors)
+    wrong_bits = (info != messages).sum(axis=1)
+    wrong = wrong_bits > 0
+    return {'trials': trials,
+            'channel_errors': int(errors.sum()),
+            'corrected': int((status == 1).sum()),
+            'detected': int((status == 2).sum()),
+            'word_errors': int(wrong.sum()),
+            'miscorrected': int((wrong & (status != 2)).sum()),
+            'residual_bit_errors': int(wrong_bits.sum())}
+
+def simulate_ber(codes, probabilities, trials, jobs=1, batch=1 << 16, seed=1):
+    tasks = []
+    for k, r in codes:
+        r = r or minimal_r_for_k(k)
+        for p in probabilities:
+            for start in range(0, trials, batch):
+                tasks.append((k, r, p, min(batch, trials - start), (seed, k, r, len(tasks))))
+    if jobs <= 1:
+        results = list(map(simulate_batch, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(simulate_batch, tasks))
+    totals = {}
+    for (k, r, p, _, _), result in zip(tasks, results):
+        total = totals.setdefault((k, r, p), dict.fromkeys(result, 0))
+        for key, value in result.items():
+            total[key] += value
+    rows = []
+    for (k, r, p), total in totals.items():
+        n_words = total['trials']
+        rows.append({'k': k, 'r': r, 'p': p, 'trials': n_words,
+                     'channel_ber': total['channel_errors'] / (n_words * (k + r + 1)),
+                     'corrected_rate': total['corrected'] / n_words,
+                     'detected_double_rate': total['detected'] / n_words,
+                     'word_error_rate': total['word_errors'] / n_words,
+                     'miscorrection_rate': total['miscorrected'] / n_words,
+                     'residual_ber': total['residual_bit_errors'] / (n_words * k)})
+    return rows
+
+def save_ber(path, rows):
+    if path.endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
 def random_info_bits(k):
     return [random.randint(0,1) for _ in range(k)]
 
@@ -249,6 +370,8 @@ def main():
 
     code_with_global = add_global_parity(beta_via_H)
     print_bits("\nКод β с глобальным битом четности", code_with_global)
+    packed = encode_int(bits_to_int(info), k, r)
+    print("Целочисленный кодер:", "совпадает" if int_to_bits(packed, n + 1) == code_with_global else "НЕ совпадает")
 
     with open("encoded_code.txt", "w", encoding="utf-8") as f:
         f.write(''.join(str(b) for b in code_with_global))
@@ -300,5 +423,71 @@ def main():
     with open("input.txt", "w", encoding="utf-8") as f:
         f.write(''.join(str(b) for b in received))
 
+def bench_main(k, r):
+    r = r or minimal_r_for_k(k)
+    info = random_info_bits(k)
+    code_with_global = add_global_parity(encode_hamming_via_H(info, r)[0])
+    enc_speed, dec_speed = benchmark_int(k, r)
+    print(f"Скорость целочисленного движка: кодирование {enc_speed:.0f} слов/с, декодирование {dec_speed:.0f} слов/с")
+    try:
+        batch_code = encode_batch([info], get_code(k, r).G)[0].tolist()
+    except ImportError:
+        print("NumPy не установлен, пакетный движок пропущен.")
+        return
+    print("Пакетный кодер NumPy:", "совпадает" if batch_code == code_with_global else "НЕ совпадает")
+    enc_speed, dec_speed = benchmark_batch(k, r)
+    print(f"Скорость пакетного движка: кодирование {enc_speed:.0f} слов/с, декодирование {dec_speed:.0f} слов/с")
+
+def file_main(argv):
+    parser = argparse.ArgumentParser(description='Защита файлов кодом Хэмминга с SECDED')
+    commands = parser.add_subparsers(dest='command', required=True)
+    protect = commands.add_parser('protect', help='закодировать файл')
+    protect.add_argument('source')
+    protect.add_argument('target')
+    protect.add_argument('-k', type=int, default=57, help='число информационных бит в слове')
+    protect.add_argument('-r', type=int, default=None, help='число проверочных бит')
+    restore = commands.add_parser('restore', help='декодировать и исправить файл')
+    restore.add_argument('source')
+    restore.add_argument('target')
+    simulate = commands.add_parser('simulate', help='моделирование вероятности ошибок')
+    simulate.add_argument('--k', default='4,11,26,57', help='значения k через запятую')
+    simulate.add_argument('--p', default='0.0001,0.001,0.01,0.05', help='вероятности ошибки в канале')
+    simulate.add_argument('--trials', type=int, default=1000000, help='число слов для каждой точки')
+    simulate.add_argument('--jobs', type=int, default=1)
+    simulate.add_argument('--seed', type=int, default=1)
+    simulate.add_argument('--output', default='ber.csv', help='файл .csv или .json')
+    bench = commands.add_parser('bench', help='скорость целочисленного и пакетного движков')
+    bench.add_argument('-k', type=int, default=57, help='число информационных бит в слове')
+    bench.add_argument('-r', type=int, default=None, help='число проверочных бит')
+    args = parser.parse_args(argv)
+    if args.command == 'bench':
+        bench_main(args.k, args.r)
+    elif args.command == 'simulate':
+        codes = [(int(k), None) for k in args.k.split(',')]
+        probabilities = [float(p) for p in args.p.split(',')]
+        t0 = time.perf_counter()
+        rows = simulate_ber(codes, probabilities, args.trials, args.jobs, seed=args.seed)
+        seconds = time.perf_counter() - t0
+        save_ber(args.output, rows)
+        print("k | r | p | исправлено | обнаружено двойных | ошибка слова | ложное исправление | остаточная BER")
+        for row in rows:
+            print(f"{row['k']} | {row['r']} | {row['p']:g} | {row['corrected_rate']:.3e} | "
+                  f"{row['detected_double_rate']:.3e} | {row['word_error_rate']:.3e} | "
+                  f"{row['miscorrection_rate']:.3e} | {row['residual_ber']:.3e}")
+        print(f"Смоделировано {sum(row['trials'] for row in rows)} слов за {seconds:.2f} с, "
+              f"результаты сохранены в {args.output}")
+    elif args.command == 'protect':
+        size, words, seconds = protect_file(args.source, args.target, args.k, args.r)
+        print(f"Закодировано {size} байт в {words} слов: {size / seconds / 1e6 if seconds else 0.0:.2f} МБ/с")
+    else:
+        stats = restore_file(args.source, args.target)
+        seconds = stats['seconds']
+        print(f"Декодировано {stats['size']} байт из {stats['words']} слов: "
+              f"{stats['size'] / seconds / 1e6 if seconds else 0.0:.2f} МБ/с")
+        print(f"Исправлено одиночных ошибок: {stats['corrected']}, обнаружено двойных: {stats['detected']}")
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        file_main(sys.argv[1:])
+    else:
+        main()
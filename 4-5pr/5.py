@@ -1,5 +1,7 @@
 import random
 
+from hamming import benchmark_int, bits_to_int, encode_int, get_code, int_to_bits, is_power_of_two
+
 def minimal_r_for_k(k):
     r = 1
     while True:
@@ -8,17 +10,6 @@ def minimal_r_for_k(k):
             return r
         r += 1
 
-def is_power_of_two(x):
-    return x and (x & (x - 1)) == 0
-
-def build_H(r, n):
-    H = [[0] * n for _ in range(r)]
-    for col in range(n):
-        num = col + 1
-        for i in range(r):
-            H[i][col] = (num >> i) & 1
-    return H
-
 def print_H_rows(H):
     print("Матрица H:")
     for i, row in enumerate(H):
@@ -55,7 +46,7 @@ def calculate_parity_bits_via_H(code, H):
 
 def encode_hamming_via_H(info_bits, r):
     code = insert_info_bits_positions(info_bits, r)
-    H = build_H(r, len(code))
+    H = get_code(len(info_bits), r).H
     code = calculate_parity_bits_via_H(code, H)
     return code, H
 
@@ -216,6 +207,10 @@ def main():
 
     code_with_global = add_global_parity(beta_via_H)
     print_bits("\nКод β с глобальным битом четности", code_with_global)
+    packed = encode_int(bits_to_int(info), k, r)
+    print("Целочисленный кодер:", "совпадает" if int_to_bits(packed, n + 1) == code_with_global else "НЕ совпадает")
+    enc_speed, dec_speed = benchmark_int(k, r)
+    print(f"Скорость целочисленного движка: кодирование {enc_speed:.0f} слов/с, декодирование {dec_speed:.0f} слов/с")
 
     with open("encoded_code.txt", "w", encoding="utf-8") as f:
         f.write(''.join(str(b) for b in code_with_global))
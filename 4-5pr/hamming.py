@@ -0,0 +1,205 @@
+from functools import cached_property, lru_cache
+import random
+import time
+
+def is_power_of_two(x):
+    return x and (x & (x - 1)) == 0
+
+def build_H(r, n):
+    H = [[0] * n for _ in range(r)]
+    for col in range(n):
+        num = col + 1
+        for i in range(r):
+            H[i][col] = (num >> i) & 1
+    return H
+
+def build_G(k, r):
+    n = k + r
+    H = build_H(r, n)
+    info_positions = [pos for pos in range(1, n+1) if not is_power_of_two(pos)]
+    if len(info_positions) != k:
+        raise ValueError("Количество информационных позиций не равно k")
+    G = []
+    for j, pos in enumerate(info_positions):
+        row = [0] * n
+        row[pos-1] = 1
+        for i in range(r):
+            parity_pos = 2 ** i
+            row[parity_pos - 1] = H[i][pos-1]
+        G.append(row)
+    return G, info_positions
+
+def bits_to_int(bits):
+    value = 0
+    for i, b in enumerate(bits):
+        if int(b):
+            value |= 1 << i
+    return value
+
+def int_to_bits(value, n):
+    return [(value >> i) & 1 for i in range(n)]
+
+def encode_batch(messages, G, packed=False):
+    import numpy as np
+
+    G = np.asarray(G, dtype=np.float32)
+    k, n = G.shape
+    messages = np.asarray(messages, dtype=np.uint8)
+    if packed:
+        messages = np.unpackbits(messages, axis=1, count=k, bitorder='little')
+    codes = (messages.astype(np.float32) @ G).astype(np.int64) & 1
+    parity = codes.sum(axis=1) & 1
+    codes = np.concatenate([codes, parity[:, None]], axis=1).astype(np.uint8)
+    if packed:
+        return np.packbits(codes, axis=1, bitorder='little')
+    return codes
+
+def decode_batch(received, H, info_positions, packed=False):
+    import numpy as np
+
+    H = np.asarray(H, dtype=np.float32)
+    r, n = H.shape
+    received = np.asarray(received, dtype=np.uint8)
+    if packed:
+        received = np.unpackbits(received, axis=1, count=n + 1, bitorder='little')
+    syndromes = (received[:, :n].astype(np.float32) @ H.T).astype(np.int64) & 1
+    pos = syndromes @ (1 << np.arange(r, dtype=np.int64))
+    parity = received.sum(axis=1, dtype=np.int64) & 1
+    status = np.zeros(len(received), dtype=np.uint8)
+    status[parity == 1] = 1
+    status[((parity == 0) & (pos != 0)) | ((parity == 1) & (pos > n))] = 2
+    fix = np.flatnonzero((status == 1) & (pos > 0))
+    corrected = received[:, :n].copy()
+    corrected[fix, pos[fix] - 1] ^= 1
+    info = corrected[:, np.asarray(info_positions) - 1]
+    if packed:
+        info = np.packbits(info, axis=1, bitorder='little')
+    return info, status
+
+class HammingCode:
+    def __init__(self, k, r):
+        n = k + r
+        self.k, self.r, self.n = k, r, n
+        self.H = build_H(r, n)
+        self.G, self.info_positions = build_G(k, r)
+        self.parity_positions = [2 ** i for i in range(r) if 2 ** i <= n]
+        self.info_tables = []
+        for b in range(0, k, 8):
+            table = []
+            for v in range(256):
+                code = 0
+                syndrome = 0
+                for bit in range(8):
+                    j = b + bit
+                    if j < k and (v >> bit) & 1:
+                        pos = self.info_positions[j]
+                        code |= 1 << (pos - 1)
+                        syndrome ^= pos
+                table.append((code, syndrome))
+            self.info_tables.append(table)
+        self.parity_table = [self.spread_parity(s) for s in range(2 ** r)] if r <= 16 else None
+        info_bit = {pos - 1: j for j, pos in enumerate(self.info_positions)}
+        self.flip_info = [1 << info_bit[i] if i in info_bit else 0 for i in range(n + 1)]
+        self.word_tables = []
+        for b in range(0, n, 8):
+            table = []
+            for v in range(256):
+                syndrome = 0
+                info = 0
+                for bit in range(8):
+                    i = b + bit
+                    if i < n and (v >> bit) & 1:
+                        syndrome ^= i + 1
+                        info |= self.flip_info[i]
+                table.append((syndrome, info))
+            self.word_tables.append(table)
+        self.actions = []
+        for syndrome in range(2 ** r):
+            for parity in (0, 1):
+                if parity == 0:
+                    self.actions.append((-1, 0 if syndrome == 0 else 2))
+                elif syndrome == 0:
+                    self.actions.append((n, 1))
+                elif syndrome <= n:
+                    self.actions.append((syndrome - 1, 1))
+                else:
+                    self.actions.append((-1, 2))
+
+    @cached_property
+    def G_array(self):
+        import numpy as np
+
+        return np.array(self.G, dtype=np.float32)
+
+    @cached_property
+    def H_array(self):
+        import numpy as np
+
+        return np.array(self.H, dtype=np.float32)
+
+    def spread_parity(self, syndrome):
+        code = 0
+        for i in range(self.r):
+            if (syndrome >> i) & 1:
+                code |= 1 << ((1 << i) - 1)
+        return code
+
+    def encode_int(self, info):
+        code = 0
+        syndrome = 0
+        for table in self.info_tables:
+            c, s = table[info & 0xFF]
+            code |= c
+            syndrome ^= s
+            info >>= 8
+        code |= self.parity_table[syndrome] if self.parity_table is not None else self.spread_parity(syndrome)
+        return code | ((code.bit_count() & 1) << self.n)
+
+    def decode_int(self, word):
+        syndrome = 0
+        info = 0
+        parity = word.bit_count() & 1
+        for table in self.word_tables:
+            s, i = table[word & 0xFF]
+            syndrome ^= s
+            info |= i
+            word >>= 8
+        flip, status = self.actions[syndrome * 2 + parity]
+        if flip >= 0:
+            info ^= self.flip_info[flip]
+        return info, status
+
+    def encode(self, info_bits):
+        return int_to_bits(self.encode_int(bits_to_int(info_bits)), self.n + 1)
+
+    def decode(self, received):
+        info, status = self.decode_int(bits_to_int(received))
+        return int_to_bits(info, self.k), status
+
+    def encode_batch(self, messages, packed=False):
+        return encode_batch(messages, self.G_array, packed)
+
+    def decode_batch(self, received, packed=False):
+        return decode_batch(received, self.H_array, self.info_positions, packed)
+
+@lru_cache(maxsize=64)
+def get_code(k, r):
+    return HammingCode(k, r)
+
+def encode_int(info, k, r):
+    return get_code(k, r).encode_int(info)
+
+def decode_int(word, k, r):
+    return get_code(k, r).decode_int(word)
+
+def benchmark_int(k, r, count=100000):
+    code = get_code(k, r)
+    words = [random.getrandbits(k) for _ in range(count)]
+    t0 = time.perf_counter()
+    codes = [code.encode_int(w) for w in words]
+    t1 = time.perf_counter()
+    decoded = [code.decode_int(c ^ (1 << random.randrange(k + r + 1)))[0] for c in codes]
+    t2 = time.perf_counter()
+    if decoded != words:
+        raise ValueError("Целочисленный декодер вернул неверные данные")
+    return count / (t1 - t0), count / (t2 - t1)
@@ -0,0 +1,172 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from prefix_coding import TableDecoder
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LABS = {
+    'fano': (os.path.join(ROOT, '2pr', '2pr.py'), 'Fano', {}),
+    'huffman': (os.path.join(ROOT, '3pr', '3pr.py'), 'Huffman', {}),
+    'huffman-canonical': (os.path.join(ROOT, '3pr', '3pr.py'), 'Huffman', {'canonical': True}),
+    'range': (os.path.join(ROOT, '3pr', '3pr.py'), 'RangeCoder', {}),
+    'rans': (os.path.join(ROOT, '3pr', '3pr.py'), 'RansCoder', {}),
+}
+REAL_CORPUS = os.path.join(ROOT, '2pr', 'text.txt')
+UNITS = {'K': 10 ** 3, 'M': 10 ** 6, 'G': 10 ** 9}
+
+
+def parse_size(value):
+    value = value.strip().upper().rstrip('B')
+    if value and value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+    return int(value)
+
+
+def load_lab(path):
+    name = 'lab_' + os.path.basename(path).replace('.py', '')
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def make_synthetic(path, size, seed=1):
+    rng = random.Random(seed)
+    alphabet = ' etaoinshrdlcumwfgypbvkjxqz\n'
+    weights = [1 / (i + 1) for i in range(len(alphabet))]
+    with open(path, 'w', encoding='utf-8') as f:
+        left = size
+        while left > 0:
+            n = min(left, 1 << 20)
+            f.write(''.join(rng.choices(alphabet, weights, k=n)))
+            left -= n
+
+
+def make_real(path, size):
+    with open(REAL_CORPUS, 'rb') as f:
+        sample = f.read()
+    with open(path, 'wb') as f:
+        left = size
+        while left > len(sample):
+            f.write(sample)
+            left -= len(sample)
+        f.write(sample[:left].decode('utf-8', errors='ignore').encode('utf-8'))
+
+
+def prepare_corpus(workdir, kind, size):
+    path = os.path.join(workdir, f'{kind}_{size}.txt')
+    if not os.path.exists(path):
+        if kind == 'synthetic':
+            make_synthetic(path, size)
+        else:
+            make_real(path, size)
+    return path
+
+
+def run_case(case):
+    coder, order, corpus, path = case['coder'], case['order'], case['corpus'], case['path']
+    lab_path, class_name, options = LABS[coder]
+    module = load_lab(lab_path)
+    codec = getattr(module, class_name)(path, jobs=case['jobs'], **options)
+    size = os.path.getsize(path)
+
+    t0 = time.perf_counter()
+    text = codec.io.load_text(path)
+    load_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    freq = codec.count_blocks(text, order)
+    n_blocks = len(text) // order
+    codes = codec.make_codes(freq, n_blocks)
+    build_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    data, nbits = codec.pack_text(text, codes, order)
+    encode_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if hasattr(codec, 'unpack_text'):
+        symbols = codec.unpack_text(data, codes, n_blocks)
+    else:
+        symbols = TableDecoder(codes).decode_packed(data, nbits)
+    decoded = ''.join(symbols) + text[n_blocks * order:]
+    decode_time = time.perf_counter() - t0
+
+    mb = size / 1e6
+    return {
+        'coder': coder,
+        'order': order,
+        'jobs': case['jobs'],
+        'corpus': corpus,
+        'input_bytes': size,
+        'symbols': n_blocks,
+        'distinct': len(freq),
+        'encoded_bits': nbits,
+        'bits_per_char': nbits / len(text) if text else 0.0,
+        'load_s': load_time,
+        'build_s': build_time,
+        'encode_s': encode_time,
+        'decode_s': decode_time,
+        'encode_mb_s': mb / encode_time if encode_time else None,
+        'decode_mb_s': mb / decode_time if decode_time else None,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'roundtrip_ok': decoded == text,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк кодеров Фано и Хаффмана')
+    parser.add_argument('--sizes', default='10K,100K,1M,10M',
+                        help='размеры корпусов через запятую, например 10K,1M,1G')
+    parser.add_argument('--corpora', default='synthetic,real')
+    parser.add_argument('--coders', default=','.join(LABS))
+    parser.add_argument('--orders', default='1,2')
+    parser.add_argument('--jobs', type=int, default=1, help='число процессов для подсчёта и кодирования')
+    parser.add_argument('--workdir', default='bench_data')
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    cases = []
+    for corpus in args.corpora.split(','):
+        for size in map(parse_size, args.sizes.split(',')):
+            path = prepare_corpus(args.workdir, corpus, size)
+            for coder in args.coders.split(','):
+                for order in map(int, args.orders.split(',')):
+                    cases.append({'coder': coder, 'order': order, 'corpus': corpus, 'path': path,
+                                  'jobs': args.jobs})
+
+    results = []
+    for case in cases:
+        # каждый замер в отдельном процессе, чтобы пиковая память не накапливалась между замерами
+        with ProcessPoolExecutor(1) as pool:
+            record = pool.submit(run_case, case).result()
+        results.append(record)
+        print(f"{record['coder']:>18} k={record['order']} {record['corpus']:>9} {record['input_bytes']:>11} Б: "
+              f"{record['bits_per_char']:.3f} бит/символ, построение {record['build_s']:.3f} с, кодирование {record['encode_mb_s'] or 0:.2f} МБ/с, "
+              f"декодирование {record['decode_mb_s'] or 0:.2f} МБ/с, память {record['peak_rss_mb']:.0f} МБ")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1339 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+import math
+import mmap
+import csv
+import hashlib
+import json
+import os
+import struct
+from itertools import chain, islice, repeat
+import sys
+import time
+import tracemalloc
+import zlib
+
+
+def assign_canonical_codes(lengths):
+    codes = {}
+    code = 0
+    prev_len = 0
+    for sym, length in sorted(lengths, key=lambda e: e[1]):
+        code <<= length - prev_len
+        codes[sym] = format(code, f'0{length}b') if length else ''
+        code += 1
+        prev_len = length
+    return codes
+
+
+def split_symbols(text, order):
+    if order == 1:
+        return text
+    return (text[i:i + order] for i in range(0, len(text) - len(text) % order, order))
+
+
+def count_block(args):
+    block, next_char = args
+    ext = block + next_char
+    return Counter(block), Counter(ext[i:i + 2] for i in range(len(ext) - 1))
+
+
+def count_symbols_numpy(text, window=1 << 24):
+    import numpy as np
+
+    n_codepoints = 0x110000
+    char_counts = np.zeros(n_codepoints, dtype=np.int64)
+    for start in range(0, len(text), window):
+        cps = np.frombuffer(text[start:start + window].encode('utf-32-le'), dtype=np.uint32)
+        char_counts += np.bincount(cps, minlength=n_codepoints)
+    alphabet = np.flatnonzero(char_counts)
+    size = len(alphabet)
+    lut = np.zeros(n_codepoints, dtype=np.int64)
+    lut[alphabet] = np.arange(size)
+    dense = size * size <= 1 << 22
+    pair_counts = np.zeros(size * size, dtype=np.int64) if dense else None
+    pair_ids = []
+    pair_parts = []
+    for start in range(0, max(len(text) - 1, 0), window):
+        cps = np.frombuffer(text[start:start + window + 1].encode('utf-32-le'), dtype=np.uint32)
+        idx = lut[cps]
+        ids = idx[:-1] * size + idx[1:]
+        if dense:
+            pair_counts += np.bincount(ids, minlength=size * size)
+        else:
+            uniq, counts = np.unique(ids, return_counts=True)
+            pair_ids.append(uniq)
+            pair_parts.append(counts)
+    if not dense and pair_ids:
+        uniq, inverse = np.unique(np.concatenate(pair_ids), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(pair_parts)).astype(np.int64)
+    elif dense:
+        uniq = np.flatnonzero(pair_counts)
+        counts = pair_counts[uniq]
+    else:
+        uniq = counts = np.zeros(0, dtype=np.int64)
+    symbols = [chr(cp) for cp in alphabet.tolist()]
+    char_freq = Counter(dict(zip(symbols, char_counts[alphabet].tolist())))
+    pair_freq = Counter({symbols[i // size] + symbols[i % size]: c
+                         for i, c in zip(uniq.tolist(), counts.tolist())})
+    return char_freq, pair_freq
+
+
+def entropy_numpy(counts):
+    import numpy as np
+
+    c = np.fromiter(counts, dtype=np.float64)
+    p = c[c > 0] / c.sum()
+    return float(-(p * np.log2(p)).sum())
+
+
+def average_length_numpy(freq, codes):
+    import numpy as np
+
+    counts = np.fromiter(freq.values(), dtype=np.float64, count=len(freq))
+    lengths = np.fromiter((len(codes[sym]) for sym in freq), dtype=np.float64, count=len(freq))
+    return float(counts @ lengths / counts.sum())
+
+
+def decode_blocks(args):
+    codes, parts = args
+    decoder = TableDecoder(codes)
+    symbols = []
+    for raw, nbits in parts:
+        symbols += decoder.decode_packed(raw, nbits)
+    return ''.join(symbols), len(symbols)
+
+
+def count_order_block(args):
+    block, order = args
+    return Counter(split_symbols(block, order))
+
+
+def encode_block(args):
+    block, codes, order = args
+    return FileManager().pack_symbols(split_symbols(block, order), codes)
+
+
+class FileManager:
+    MAGIC = b'DSKR'
+    TABLES_MAGIC = b'DSKT'
+    INDEX_MAGIC = b'DSKX'
+    FLAG_CANONICAL = 1
+    FLAG_CONTEXT = 2
+
+    def __init__(self, use_mmap=False):
+        self.use_mmap = use_mmap
+
+    def load_text(self, path):
+        if self.use_mmap:
+            with open(path, 'rb') as f:
+                mm = self.map_file(f)
+                if mm is None:
+                    return ''
+                with mm:
+                    return str(mm, 'utf-8')
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def write_text(self, path, text):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def iter_text(self, path, chunk_size=1 << 20):
+        if self.use_mmap:
+            yield from self.iter_mapped(path, chunk_size)
+            return
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def map_file(self, f):
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_mapped(self, path, chunk_size=1 << 20):
+        chunk_size = max(chunk_size, 4)
+        with open(path, 'rb') as f:
+            mm = self.map_file(f)
+            if mm is None:
+                return
+            view = memoryview(mm)
+            try:
+                start = 0
+                size = len(mm)
+                while start < size:
+                    end = min(start + chunk_size, size)
+                    while end < size and mm[end] & 0xC0 == 0x80:
+                        end -= 1
+                    yield str(view[start:end], 'utf-8')
+                    start = end
+            finally:
+                view.release()
+                mm.close()
+
+    def files_equal(self, path_a, path_b, chunk_size=1 << 20):
+        with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb:
+            while True:
+                a = fa.read(chunk_size)
+                b = fb.read(chunk_size)
+                if a != b:
+                    return False
+                if not a:
+                    return True
+
+    def file_digest(self, path, chunk_size=1 << 20):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            if self.use_mmap:
+                mm = self.map_file(f)
+                if mm is not None:
+                    with mm:
+                        digest.update(mm)
+                return digest.hexdigest()
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def save_char_stats(self, path, counts: Counter, total):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Character', 'Frequency', 'Probability'])
+            for ch, cnt in counts.most_common():
+                w.writerow([ch, cnt, f"{cnt}/{total}"])
+
+    def save_char_codes(self, path, codes, counts: Counter, total):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Character', 'Probability', 'Code'])
+            for ch, code in codes.items():
+                w.writerow([ch, f"{counts[ch]}/{total}", code])
+
+    def save_pair_stats(self, path, counts: Counter, total):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Pair', 'Frequency', 'Probability'])
+            for p, cnt in counts.most_common():
+                w.writerow([p, cnt, f"{cnt}/{total}"])
+
+    def save_pair_codes(self, path, codes, counts: Counter, total):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Pair', 'Probability', 'Code'])
+            for p, code in codes.items():
+                w.writerow([p, f"{counts[p]}/{total}", code])
+
+    def pack_bits(self, bits):
+        pad = -len(bits) % 8
+        if not bits:
+            return b''
+        return (int(bits, 2) << pad).to_bytes((len(bits) + pad) // 8, 'big')
+
+    def unpack_bits(self, raw, nbits):
+        if nbits == 0:
+            return ''
+        return format(int.from_bytes(raw, 'big') >> (len(raw) * 8 - nbits), f'0{nbits}b')
+
+    def iter_packed(self, symbol_chunks, codes):
+        carry = ''
+        for chunk in symbol_chunks:
+            try:
+                bits = carry + ''.join([codes[sym] for sym in chunk])
+            except KeyError as e:
+                raise ValueError(f"Символ {e.args[0]!r} отсутствует в таблице кодов")
+            whole = len(bits) - len(bits) % 8
+            yield int(bits[:whole], 2).to_bytes(whole // 8, 'big') if whole else b'', len(bits) - len(carry)
+            carry = bits[whole:]
+        yield self.pack_bits(carry), 0
+
+    def pack_symbols(self, symbols, codes, chunk_size=1 << 16):
+        it = iter(symbols)
+        chunks = iter(lambda: list(islice(it, chunk_size)), [])
+        out = bytearray()
+        nbits = 0
+        for data, produced in self.iter_packed(chunks, codes):
+            out += data
+            nbits += produced
+        return bytes(out), nbits
+
+    def join_packed(self, parts):
+        out = bytearray()
+        carry = 0
+        carry_bits = 0
+        nbits = 0
+        for data, n in parts:
+            if n == 0:
+                continue
+            value = (carry << n) | (int.from_bytes(data, 'big') >> (len(data) * 8 - n))
+            total = carry_bits + n
+            carry_bits = total % 8
+            out += (value >> carry_bits).to_bytes(total // 8, 'big')
+            carry = value & ((1 << carry_bits) - 1)
+            nbits += n
+        if carry_bits:
+            out.append(carry << (8 - carry_bits))
+        return bytes(out), nbits
+
+    def write_header(self, f, codes, nbits, n_symbols, tail='', canonical=False, context=False):
+        flags = (self.FLAG_CANONICAL if canonical else 0) | (self.FLAG_CONTEXT if context else 0)
+        entries = codes.items()
+        if canonical:
+            entries = sorted(entries, key=lambda e: (len(e[1]), e[1]))
+        f.write(struct.pack('>4sBQBI', self.MAGIC, flags, n_symbols, -nbits % 8, len(codes)))
+        for sym, code in entries:
+            raw = sym.encode('utf-8')
+            f.write(struct.pack('>HH', len(raw), len(code)))
+            f.write(raw)
+            if not canonical:
+                f.write(self.pack_bits(code))
+        raw = tail.encode('utf-8')
+        f.write(struct.pack('>H', len(raw)))
+        f.write(raw)
+
+    def read_header(self, f):
+        magic, flags, n_symbols, pad, n_codes = struct.unpack('>4sBQBI', f.read(18))
+        if magic != self.MAGIC:
+            raise ValueError(f"Файл {f.name} не является закодированным потоком")
+        canonical = flags & self.FLAG_CANONICAL
+        codes = {}
+        lengths = []
+        for _ in range(n_codes):
+            sym_len, code_len = struct.unpack('>HH', f.read(4))
+            sym = f.read(sym_len).decode('utf-8')
+            if canonical:
+                lengths.append((sym, code_len))
+            else:
+                codes[sym] = self.unpack_bits(f.read((code_len + 7) // 8), code_len)
+        if canonical:
+            codes = assign_canonical_codes(lengths)
+        (tail_len,) = struct.unpack('>H', f.read(2))
+        tail = f.read(tail_len).decode('utf-8')
+        return codes, pad, n_symbols, tail, flags
+
+    def save_encoded(self, path, codes, data, nbits, n_symbols, tail='', canonical=False, context=False):
+        with open(path, 'wb') as f:
+            self.write_header(f, codes, nbits, n_symbols, tail, canonical, context)
+            f.write(data)
+
+    def load_encoded(self, path):
+        with open(path, 'rb') as f:
+            codes, pad, n_symbols, tail, flags = self.read_header(f)
+            data = f.read()
+        return codes, data, len(data) * 8 - pad, n_symbols, tail, flags
+
+    def write_table(self, f, freq, codes):
+        f.write(struct.pack('>I', len(freq)))
+        for sym, count in freq.items():
+            raw = sym.encode('utf-8')
+            code = codes[sym]
+            f.write(struct.pack('>HQH', len(raw), count, len(code)))
+            f.write(raw)
+            f.write(self.pack_bits(code))
+
+    def read_table(self, f):
+        freq = Counter()
+        codes = {}
+        (n_entries,) = struct.unpack('>I', f.read(4))
+        for _ in range(n_entries):
+            sym_len, count, code_len = struct.unpack('>HQH', f.read(12))
+            sym = f.read(sym_len).decode('utf-8')
+            freq[sym] = count
+            codes[sym] = self.unpack_bits(f.read((code_len + 7) // 8), code_len)
+        return freq, codes
+
+    def save_tables(self, path, char_freq, pair_freq, char_codes, pair_codes):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.TABLES_MAGIC)
+            self.write_table(f, char_freq, char_codes)
+            self.write_table(f, pair_freq, pair_codes)
+        os.replace(tmp_path, path)
+
+    def load_tables(self, path):
+        with open(path, 'rb') as f:
+            if f.read(4) != self.TABLES_MAGIC:
+                raise ValueError(f"Файл {path} не является кэшем кодовых таблиц")
+            char_freq, char_codes = self.read_table(f)
+            pair_freq, pair_codes = self.read_table(f)
+        return char_freq, pair_freq, char_codes, pair_codes
+
+    def encode_file(self, path, symbols, codes, n_symbols, tail='', canonical=False):
+        data, nbits = self.pack_symbols(symbols, codes)
+        self.save_encoded(path, codes, data, nbits, n_symbols, tail, canonical)
+        return nbits
+
+    def single_symbol(self, codes):
+        if len(codes) == 1:
+            sym, code = next(iter(codes.items()))
+            if not code:
+                return sym
+        return None
+
+    def decode_context(self, codes, data, n_symbols, first):
+        return first + ''.join(ContextDecoder(codes).decode_packed(data, n_symbols, first))
+
+    def decode_file(self, path):
+        codes, data, nbits, n_symbols, tail, flags = self.load_encoded(path)
+        if flags & self.FLAG_CONTEXT:
+            return self.decode_context(codes, data, n_symbols, tail)
+        only = self.single_symbol(codes)
+        if only is not None:
+            return only * n_symbols + tail
+        symbols = TableDecoder(codes).decode_packed(data, nbits)
+        if len(symbols) != n_symbols:
+            raise ValueError(f"Ожидалось {n_symbols} символов, декодировано {len(symbols)}")
+        return ''.join(symbols) + tail
+
+    def encode_stream(self, path, symbol_chunks, codes, n_symbols, tail='', canonical=False):
+        nbits = 0
+        with open(path, 'wb') as f:
+            self.write_header(f, codes, 0, n_symbols, tail, canonical)
+            for data, produced in self.iter_packed(symbol_chunks, codes):
+                f.write(data)
+                nbits += produced
+            f.seek(struct.calcsize('>4sBQ'))
+            f.write(struct.pack('>B', -nbits % 8))
+        return nbits
+
+    def decode_stream(self, path, out_path, chunk_size=1 << 20):
+        with open(path, 'rb') as f:
+            codes, pad, n_symbols, tail, flags = self.read_header(f)
+            if flags & self.FLAG_CONTEXT:
+                self.write_text(out_path, self.decode_context(codes, f.read(), n_symbols, tail))
+                return n_symbols
+            with open(out_path, 'w', encoding='utf-8', newline='') as out:
+                only = self.single_symbol(codes)
+                if only is not None:
+                    out.write(only * n_symbols + tail)
+                    return n_symbols
+                start = f.tell()
+                nbits = (f.seek(0, os.SEEK_END) - start) * 8 - pad
+                f.seek(start)
+                chunks = iter(lambda: f.read(chunk_size), b'')
+                decoded = 0
+                for symbols in TableDecoder(codes).decode_stream(chunks, nbits):
+                    out.write(''.join(symbols))
+                    decoded += len(symbols)
+                if decoded != n_symbols:
+                    raise ValueError(f"Ожидалось {n_symbols} символов, декодировано {decoded}")
+                out.write(tail)
+        return decoded
+
+
+    def encode_indexed(self, path, symbols, codes, n_symbols, tail='', canonical=False, block_size=1 << 16):
+        it = iter(symbols)
+        blocks = iter(lambda: list(islice(it, block_size)), [])
+        checksums = []
+
+        def checked_blocks():
+            for block in blocks:
+                checksums.append(zlib.crc32(''.join(block).encode('utf-8')))
+                yield block
+
+        offsets = []
+        nbits = 0
+        with open(path, 'wb') as f:
+            f.write(struct.pack('>4sQQ', self.INDEX_MAGIC, block_size, 0))
+            self.write_header(f, codes, 0, n_symbols, tail, canonical)
+            for data, produced in self.iter_packed(checked_blocks(), codes):
+                offsets.append(nbits)
+                f.write(data)
+                nbits += produced
+            offsets.pop()
+            index_offset = f.tell()
+            f.write(struct.pack('>I', len(offsets)))
+            for i, (bit_offset, checksum) in enumerate(zip(offsets, checksums)):
+                f.write(struct.pack('>QQI', bit_offset, i * block_size, checksum))
+            f.seek(struct.calcsize('>4sQ'))
+            f.write(struct.pack('>Q', index_offset))
+            f.seek(struct.calcsize('>4sQQ') + struct.calcsize('>4sBQ'))
+            f.write(struct.pack('>B', -nbits % 8))
+        return nbits
+
+    def read_index(self, f):
+        magic, block_size, index_offset = struct.unpack('>4sQQ', f.read(struct.calcsize('>4sQQ')))
+        if magic != self.INDEX_MAGIC:
+            raise ValueError(f"Файл {f.name} не является индексированным потоком")
+        codes, pad, n_symbols, tail, flags = self.read_header(f)
+        data_start = f.tell()
+        nbits = (index_offset - data_start) * 8 - pad
+        f.seek(index_offset)
+        (n_blocks,) = struct.unpack('>I', f.read(4))
+        index = [struct.unpack('>QQI', f.read(20)) for _ in range(n_blocks)]
+        return codes, tail, n_symbols, nbits, data_start, block_size, index
+
+    def read_blocks(self, f, data_start, bit_starts, bit_end):
+        first = bit_starts[0] // 8
+        f.seek(data_start + first)
+        raw = f.read((bit_end + 7) // 8 - first)
+        bounds = bit_starts[1:] + [bit_end]
+        parts = []
+        for start, end in zip(bit_starts, bounds):
+            lo = start // 8 - first
+            hi = (end + 7) // 8 - first
+            skip = start % 8
+            chunk = raw[lo:hi]
+            if skip:
+                value = (int.from_bytes(chunk, 'big') << skip) & ((1 << len(chunk) * 8) - 1)
+                chunk = value.to_bytes(len(chunk), 'big')
+            parts.append((chunk, end - start))
+        return parts
+
+    def decode_range(self, path, start, end):
+        if start < 0:
+            raise ValueError(f"Начало диапазона не может быть отрицательным: {start}")
+        with open(path, 'rb') as f:
+            codes, tail, n_symbols, nbits, data_start, block_size, index = self.read_index(f)
+            end = min(end, n_symbols)
+            if start >= end:
+                return ''
+            only = self.single_symbol(codes)
+            if only is not None:
+                return only * (end - start)
+            first = start // block_size
+            last = (end - 1) // block_size
+            bit_end = index[last + 1][0] if last + 1 < len(index) else nbits
+            parts = self.read_blocks(f, data_start, [entry[0] for entry in index[first:last + 1]], bit_end)
+        decoder = TableDecoder(codes)
+        symbols = []
+        for raw, n in parts:
+            symbols += decoder.decode_packed(raw, n)
+        skip = start - index[first][1]
+        return ''.join(symbols[skip:skip + end - start])
+
+    def decode_indexed(self, path, jobs=1):
+        with open(path, 'rb') as f:
+            codes, tail, n_symbols, nbits, data_start, block_size, index = self.read_index(f)
+            only = self.single_symbol(codes)
+            if only is not None:
+                return only * n_symbols + tail
+            groups = []
+            step = max(1, -(-len(index) // max(jobs, 1)))
+            for g in range(0, len(index), step):
+                bit_starts = [entry[0] for entry in index[g:g + step]]
+                bit_end = index[g + step][0] if g + step < len(index) else nbits
+                groups.append((codes, self.read_blocks(f, data_start, bit_starts, bit_end)))
+        if jobs <= 1 or len(groups) <= 1:
+            results = [decode_blocks(group) for group in groups]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(decode_blocks, groups))
+        decoded = sum(n for _, n in results)
+        if decoded != n_symbols:
+            raise ValueError(f"Ожидалось {n_symbols} символов, декодировано {decoded}")
+        return ''.join(text for text, _ in results) + tail
+
+    def verify_indexed(self, path, jobs=1, window=64):
+        with open(path, 'rb') as f:
+            codes, tail, n_symbols, nbits, data_start, block_size, index = self.read_index(f)
+            decoder = TableDecoder(codes)
+            only = self.single_symbol(codes)
+
+            def read_block(i):
+                bit_start, symbol_offset, checksum = index[i]
+                bit_end = index[i + 1][0] if i + 1 < len(index) else nbits
+                (raw, n), = self.read_blocks(f, data_start, [bit_start], bit_end)
+                return i, raw, n, min(block_size, n_symbols - symbol_offset), checksum
+
+            def check(args):
+                i, raw, n, expected, checksum = args
+                try:
+                    symbols = [only] * expected if only is not None else decoder.decode_packed(raw, n)
+                except ValueError:
+                    return i
+                if len(symbols) != expected or zlib.crc32(''.join(symbols).encode('utf-8')) != checksum:
+                    return i
+                return None
+
+            blocks = map(read_block, range(len(index)))
+            if jobs <= 1:
+                results = list(map(check, blocks))
+            else:
+                results = []
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    for batch in iter(lambda: list(islice(blocks, window)), []):
+                        results += pool.map(check, batch)
+        return [i for i in results if i is not None]
+
+
+class Metrics:
+    def __init__(self, path=None, log=False, trace_allocations=False):
+        self.path = path
+        self.log = log
+        self.trace_allocations = trace_allocations
+        self.records = []
+
+    def phase(self, name, nbytes=0, **info):
+        return MetricsPhase(self, name, nbytes, info)
+
+    def add(self, record):
+        self.records.append(record)
+        if self.log:
+            print(json.dumps(record, ensure_ascii=False), file=sys.stderr)
+
+    def save(self, path=None):
+        with open(path or self.path, 'w', encoding='utf-8') as f:
+            json.dump({'phases': self.records}, f, ensure_ascii=False, indent=2)
+
+
+class MetricsPhase:
+    def __init__(self, metrics, name, nbytes, info):
+        self.metrics = metrics
+        self.record = {'phase': name, 'bytes': nbytes, **info}
+
+    def __enter__(self):
+        self.started_tracing = self.metrics.trace_allocations and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        if self.metrics.trace_allocations:
+            tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        record = self.record
+        record['wall_s'] = wall
+        record['cpu_s'] = time.process_time() - self.cpu_start
+        record['mb_per_s'] = record['bytes'] / wall / 1e6 if wall > 0 and record['bytes'] else None
+        if self.metrics.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_net_bytes'] = current - self.mem_start
+            record['alloc_peak_bytes'] = peak - self.mem_start
+        if self.started_tracing:
+            tracemalloc.stop()
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        self.metrics.add(record)
+        return False
+
+
+NO_METRICS = nullcontext()
+
+
+class TableDecoder:
+    def __init__(self, codes, index_bits=10):
+        self.max_len = max((len(c) for c in codes.values()), default=0)
+        self.index_bits = max(1, min(index_bits, self.max_len))
+        self.symbols, self.lengths = self._build_level(list(codes.items()), 0)
+
+    def _build_level(self, entries, depth):
+        k = self.index_bits
+        symbols = [None] * (1 << k)
+        lengths = [0] * (1 << k)
+        longer = {}
+        for sym, code in entries:
+            rest = code[depth:]
+            if not rest:
+                continue
+            if len(rest) <= k:
+                start = int(rest, 2) << (k - len(rest))
+                for idx in range(start, start + (1 << (k - len(rest)))):
+                    symbols[idx] = sym
+                    lengths[idx] = len(rest)
+            else:
+                longer.setdefault(int(rest[:k], 2), []).append((sym, code))
+        for idx, group in longer.items():
+            symbols[idx] = self._build_level(group, depth + k)
+            lengths[idx] = -1
+        return symbols, lengths
+
+    def decode_stream(self, chunks, nbits):
+        if self.max_len == 0:
+            return
+        k = self.index_bits
+        mask = (1 << k) - 1
+        chunks = chain(chunks, repeat(bytes(8)))
+        data = b''
+        size = 0
+        i = 0
+        acc = 0
+        have = 0
+        pos = 0
+        out = []
+        append = out.append
+        symbols, lengths = self.symbols, self.lengths
+        while pos < nbits:
+            while have < k:
+                if i == size:
+                    if out:
+                        yield out
+                        out = []
+                        append = out.append
+                    data = next(chunks)
+                    size = len(data)
+                    i = 0
+                    continue
+                acc = (acc << 8) | data[i]
+                i += 1
+                have += 8
+            idx = (acc >> (have - k)) & mask
+            l = lengths[idx]
+            if l > 0:
+                append(symbols[idx])
+                have -= l
+                pos += l
+                symbols, lengths = self.symbols, self.lengths
+            elif l == 0:
+                raise ValueError(f"Недопустимая кодовая комбинация на позиции {pos}")
+            else:
+                symbols, lengths = symbols[idx]
+                have -= k
+                pos += k
+            acc &= (1 << have) - 1
+        if out:
+            yield out
+
+    def decode_packed(self, data, nbits):
+        out = []
+        for symbols in self.decode_stream([data], nbits):
+            out += symbols
+        return out
+
+    def decode(self, bits):
+        data = FileManager().pack_bits(bits)
+        return ''.join(self.decode_packed(data, len(bits)))
+
+
+class ContextDecoder:
+    def __init__(self, codes, index_bits=10):
+        groups = {}
+        for pair, code in codes.items():
+            groups.setdefault(pair[0], {})[pair[1:]] = code
+        self.decoders = {prev: TableDecoder(table, index_bits) for prev, table in groups.items()}
+        self.only = {prev: next(iter(table)) for prev, table in groups.items() if len(table) == 1}
+
+    def decode_packed(self, data, n_symbols, first):
+        out = []
+        append = out.append
+        size = len(data)
+        acc = 0
+        have = 0
+        i = 0
+        prev = first
+        for _ in range(n_symbols):
+            sym = self.only.get(prev)
+            if sym is None:
+                decoder = self.decoders[prev]
+                k = decoder.index_bits
+                mask = (1 << k) - 1
+                symbols, lengths = decoder.symbols, decoder.lengths
+                while True:
+                    while have < k:
+                        acc = (acc << 8) | (data[i] if i < size else 0)
+                        i += 1
+                        have += 8
+                    idx = (acc >> (have - k)) & mask
+                    l = lengths[idx]
+                    if l > 0:
+                        sym = symbols[idx]
+                        have -= l
+                        break
+                    if l == 0:
+                        raise ValueError(f"Недопустимая кодовая комбинация после символа {prev!r}")
+                    symbols, lengths = symbols[idx]
+                    have -= k
+                acc &= (1 << have) - 1
+            append(sym)
+            prev = sym
+        return out
+
+
+class PrefixCoder:
+    canonical = False
+
+    def __init__(self, source_path='text.txt', file_manager=None, jobs=1, vectorized=False, cache_dir=None,
+                 verify='decode', metrics=None):
+        self.source_path = source_path
+        self.io = file_manager if file_manager is not None else FileManager()
+        self.jobs = jobs
+        self.vectorized = vectorized
+        self.cache_dir = cache_dir
+        self.verify = verify
+        self.metrics = metrics
+
+    def make_codes(self, freq, total):
+        raise NotImplementedError
+
+    def cache_tag(self):
+        raise NotImplementedError
+
+    def bits_to_text(self, bits, decoding_map):
+        out = []
+        pos = 0
+        L = len(bits)
+        while pos < L:
+            for l in range(1, L - pos + 1):
+                seg = bits[pos:pos + l]
+                if seg in decoding_map:
+                    out.append(decoding_map[seg])
+                    pos += l
+                    break
+        return ''.join(out)
+
+    def block_bounds(self, n, order=1):
+        size = max(-(-n // (self.jobs * 4)), 1 << 16)
+        size += -size % order
+        return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+    def count_symbols(self, text):
+        if self.vectorized:
+            return count_symbols_numpy(text)
+        if self.jobs <= 1:
+            return Counter(text), Counter(text[i:i + 2] for i in range(len(text) - 1))
+        blocks = [(text[a:b], text[b:b + 1]) for a, b in self.block_bounds(len(text))]
+        char_freq = Counter()
+        pair_freq = Counter()
+        with ProcessPoolExecutor(self.jobs) as pool:
+            for chars, pairs in pool.map(count_block, blocks):
+                char_freq.update(chars)
+                pair_freq.update(pairs)
+        return char_freq, pair_freq
+
+    def entropy(self, freq, total):
+        if self.vectorized:
+            return entropy_numpy(freq.values())
+        return -sum(c / total * math.log2(c / total) for c in freq.values())
+
+    def average_length(self, freq, codes, total):
+        if self.vectorized:
+            return average_length_numpy(freq, codes)
+        return sum(c * len(codes[sym]) for sym, c in freq.items()) / total
+
+    def build_tables(self, text, orders=(1, 2)):
+        cache_path = None
+        if self.cache_dir is not None:
+            digest = self.io.file_digest(self.source_path)
+            tag = self.cache_tag() if len(orders) == 2 else f'{self.cache_tag()}-k{orders[0]}'
+            cache_path = os.path.join(self.cache_dir, f'{tag}-{digest}.bin')
+            if os.path.exists(cache_path):
+                with self.phase('load_cache', os.path.getsize(cache_path)):
+                    return self.io.load_tables(cache_path)
+        source_bytes = os.path.getsize(self.source_path)
+        n_chars = len(text)
+        total_pairs = max(n_chars - 1, 0)
+        with self.phase('count', source_bytes):
+            if 2 in orders or self.vectorized:
+                char_freq, pair_freq = self.count_symbols(text)
+            else:
+                char_freq, pair_freq = self.count_blocks(text, 1), Counter()
+            if 2 not in orders:
+                pair_freq = Counter()
+            if 1 not in orders:
+                char_freq = Counter()
+        with self.phase('build_codes', symbols=len(char_freq) + len(pair_freq)):
+            char_codes = self.make_codes(char_freq, n_chars)
+            pair_codes = self.make_codes(pair_freq, total_pairs)
+        if cache_path is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self.phase('save_cache'):
+                self.io.save_tables(cache_path, char_freq, pair_freq, char_codes, pair_codes)
+        return char_freq, pair_freq, char_codes, pair_codes
+
+    def run_indexed(self, block_size=1 << 16, path='encoded_chars_indexed.bin'):
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('load', source_bytes):
+            text = self.io.load_text(self.source_path)
+        char_codes = self.build_tables(text, (1,))[2]
+        with self.phase('encode', source_bytes, path=path):
+            nbits = self.io.encode_indexed(path, text, char_codes, len(text), canonical=self.canonical,
+                                           block_size=block_size)
+        print(f"Текст закодирован блоками по {block_size} символов: {nbits} бит, {os.path.getsize(path)} байт")
+
+        start = len(text) // 2
+        end = min(start + 1000, len(text))
+        t0 = time.perf_counter()
+        with self.phase('decode_range', path=path, start=start, end=end):
+            part = self.io.decode_range(path, start, end)
+        elapsed = time.perf_counter() - t0
+        print(f"Фрагмент [{start}, {end}) декодирован за {elapsed * 1000:.2f} мс")
+        if part == text[start:end]:
+            print("Фрагмент совпадает с исходным текстом.")
+        else:
+            print("Ошибка: фрагмент отличается от исходного текста!")
+
+        t0 = time.perf_counter()
+        with self.phase('decode', source_bytes, path=path):
+            decoded = self.io.decode_indexed(path, self.jobs)
+        elapsed = time.perf_counter() - t0
+        print(f"Полное декодирование ({self.jobs} проц.): {self.throughput(decoded, elapsed):.2f} МБ/с")
+        if decoded == text:
+            print("Декодированный текст идентичен исходному.")
+        else:
+            print("Ошибка: декодированный текст отличается от исходного!")
+
+    def count_blocks(self, text, order):
+        if self.jobs <= 1:
+            return Counter(split_symbols(text, order))
+        blocks = [(text[a:b], order) for a, b in self.block_bounds(len(text), order)]
+        freq = Counter()
+        with ProcessPoolExecutor(self.jobs) as pool:
+            for part in pool.map(count_order_block, blocks):
+                freq.update(part)
+        return freq
+
+    def pack_text(self, text, codes, order=1):
+        if self.jobs <= 1:
+            return self.io.pack_symbols(split_symbols(text, order), codes)
+        blocks = [(text[a:b], codes, order) for a, b in self.block_bounds(len(text), order)]
+        with ProcessPoolExecutor(self.jobs) as pool:
+            return self.io.join_packed(pool.map(encode_block, blocks))
+
+    def encode_blocks(self, text, order, path):
+        freq = self.count_blocks(text, order)
+        n_blocks = len(text) // order
+        codes = self.make_codes(freq, n_blocks)
+        data, nbits = self.pack_text(text, codes, order)
+        self.io.save_encoded(path, codes, data, nbits, n_blocks, text[n_blocks * order:], self.canonical)
+        return freq, codes, nbits
+
+    def make_context_codes(self, pair_freq):
+        contexts = {}
+        for pair, cnt in pair_freq.items():
+            contexts.setdefault(pair[0], Counter())[pair[1]] = cnt
+        codes = {}
+        for prev, freq in contexts.items():
+            for sym, code in self.make_codes(freq, sum(freq.values())).items():
+                codes[prev + sym] = code
+        return codes, contexts
+
+    def run_context(self):
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('load', source_bytes):
+            text = self.io.load_text(self.source_path)
+        n_chars = len(text)
+        print(f"Количество символов в тексте: {n_chars}\n")
+        char_freq, pair_freq = self.build_tables(text)[:2]
+        total_pairs = max(n_chars - 1, 0)
+
+        t0 = time.perf_counter()
+        with self.phase('build_codes', symbols=len(pair_freq), model='context'):
+            context_codes, contexts = self.make_context_codes(pair_freq)
+        context_build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        with self.phase('build_codes', symbols=len(pair_freq), model='pairs'):
+            self.make_codes(pair_freq, total_pairs)
+        pair_build = time.perf_counter() - t0
+        largest = max((len(freq) for freq in contexts.values()), default=0)
+        print(f"Контекстов: {len(contexts)}, самая большая таблица: {largest} кодов "
+              f"(таблица пар: {len(pair_freq)} кодов)")
+        print(f"Построение кодов: {context_build:.4f} с по контекстам, {pair_build:.4f} с для таблицы пар")
+
+        transitions = (text[i:i + 2] for i in range(total_pairs))
+        with self.phase('encode', source_bytes, path='encoded_context.bin'):
+            data, nbits = self.io.pack_symbols(transitions, context_codes)
+            self.io.save_encoded('encoded_context.bin', context_codes, data, nbits, total_pairs, text[:1],
+                                 context=True)
+        print(f"Текст закодирован с контекстом первого порядка. Длина битовой последовательности: {nbits} бит")
+
+        t0 = time.perf_counter()
+        with self.phase('decode', source_bytes, path='encoded_context.bin'):
+            decoded = self.io.decode_file('encoded_context.bin')
+        elapsed = time.perf_counter() - t0
+        print(f"Скорость декодирования: {self.throughput(decoded, elapsed):.2f} МБ/с")
+        if decoded == text:
+            print("Декодированный текст идентичен исходному.")
+        else:
+            print("Ошибка: декодированный текст отличается от исходного!")
+
+        H1 = -sum(c / n_chars * math.log2(c / n_chars) for c in char_freq.values())
+        H_pair = -sum(c / total_pairs * math.log2(c / total_pairs) for c in pair_freq.values())
+        print(f"\nУсловная энтропия H(X|X-1): {H_pair - H1} бит на символ")
+        print(f"Средняя длина кода: {nbits / n_chars} бит на символ")
+        pair_bits = self.pack_text(text, self.make_codes(self.count_blocks(text, 2), n_chars // 2), 2)[1]
+        print(f"Для сравнения, кодирование парами: {pair_bits / n_chars} бит на символ")
+        return nbits
+
+    def run_orders(self, orders=(1, 2, 3)):
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('load', source_bytes):
+            text = self.io.load_text(self.source_path)
+        n_chars = len(text)
+        print(f"Количество символов в тексте: {n_chars}\n")
+        print("k | блоков | уникальных | энтропия/символ | средняя длина/символ | эффективность | длина (бит)")
+        results = {}
+        for order in orders:
+            path = f'encoded_k{order}.bin'
+            with self.phase('encode', source_bytes, path=path, order=order):
+                freq, codes, nbits = self.encode_blocks(text, order, path)
+            n_blocks = n_chars // order
+            entropy = -sum(c / n_blocks * math.log2(c / n_blocks) for c in freq.values())
+            avg_len = nbits / n_blocks if n_blocks else 0.0
+            efficiency = entropy / avg_len if avg_len else 1.0
+            with self.phase('decode', source_bytes, path=path, order=order):
+                ok = self.io.decode_file(path) == text
+            results[order] = {'blocks': n_blocks, 'distinct': len(freq), 'entropy': entropy,
+                              'avg_len': avg_len, 'bits': nbits, 'decoded_ok': ok}
+            print(f"{order} | {n_blocks} | {len(freq)} | {entropy / order:.4f} | {avg_len / order:.4f} | "
+                  f"{efficiency:.4f} | {nbits}{'' if ok else ' (ошибка декодирования)'}")
+        base = results.get(orders[0])
+        if base:
+            for order in orders[1:]:
+                if results[order]['bits']:
+                    print(f"Коэффициент сжатия k={order} относительно k={orders[0]}: "
+                          f"{base['bits'] / results[order]['bits']:.4f}")
+        return results
+
+    def throughput(self, text, seconds):
+        if seconds <= 0:
+            return float('inf')
+        return len(text.encode('utf-8')) / seconds / 1e6
+
+    def check_encoded(self, path, decoded_path, text, label):
+        if self.verify == 'none':
+            print("Проверка декодированием пропущена.")
+            return
+        source_bytes = os.path.getsize(self.source_path)
+        if self.verify == 'crc':
+            self.check_crc(path, source_bytes)
+            return
+        t0 = time.perf_counter()
+        with self.phase('decode', source_bytes, path=path):
+            decoded = self.io.decode_file(path)
+        elapsed = time.perf_counter() - t0
+        print(f"Декодирование {label} завершено успешно.")
+        print(f"Скорость декодирования: {self.throughput(decoded, elapsed):.2f} МБ/с")
+        self.io.write_text(decoded_path, decoded)
+        print(f"Декодированный текст сохранен в {decoded_path}")
+        with self.phase('verify', source_bytes, path=path, method='compare'):
+            same = decoded == text
+        if same:
+            print("Декодированный текст идентичен исходному.")
+        else:
+            print("Ошибка: декодированный текст отличается от исходного!")
+
+    def check_crc(self, path, source_bytes):
+        t0 = time.perf_counter()
+        with self.phase('verify', source_bytes, path=path, method='crc32'):
+            failed = self.io.verify_indexed(path, self.jobs)
+        elapsed = time.perf_counter() - t0
+        speed = source_bytes / elapsed / 1e6 if elapsed > 0 else float('inf')
+        print(f"Проверка CRC32 по блокам: {speed:.2f} МБ/с")
+        if failed:
+            print(f"Ошибка: блоки {', '.join(map(str, failed))} не прошли проверку CRC32!")
+        else:
+            print("Все блоки прошли проверку CRC32.")
+
+    def check_stream(self, path, decoded_path, chunk_size):
+        if self.verify == 'none':
+            print("Проверка декодированием пропущена.")
+            return
+        source_bytes = os.path.getsize(self.source_path)
+        if self.verify == 'crc':
+            self.check_crc(path, source_bytes)
+            return
+        with self.phase('decode', source_bytes, path=path):
+            self.io.decode_stream(path, decoded_path, chunk_size)
+        print(f"{path} декодирован в {decoded_path}")
+        with self.phase('verify', source_bytes, path=path, method='compare'):
+            same = self.io.files_equal(decoded_path, self.source_path)
+        if same:
+            print("Декодированный текст идентичен исходному.")
+        else:
+            print("Ошибка: декодированный текст отличается от исходного!")
+
+    def phase(self, name, nbytes=0, **info):
+        if self.metrics is None:
+            return NO_METRICS
+        return self.metrics.phase(name, nbytes, **info)
+
+    def count_stream(self, chunk_size):
+        char_freq = Counter()
+        pair_freq = Counter()
+        n_chars = 0
+        prev = ''
+        for chunk in self.io.iter_text(self.source_path, chunk_size):
+            char_freq.update(chunk)
+            s = prev + chunk
+            pair_freq.update(s[i:i + 2] for i in range(len(s) - 1))
+            prev = chunk[-1]
+            n_chars += len(chunk)
+        return char_freq, pair_freq, n_chars, prev
+
+    def iter_block_chunks(self, chunk_size, order=2):
+        carry = ''
+        for chunk in self.io.iter_text(self.source_path, chunk_size):
+            s = carry + chunk
+            whole = len(s) - len(s) % order
+            yield list(split_symbols(s[:whole], order))
+            carry = s[whole:]
+
+    def run_streaming(self, chunk_size=1 << 20):
+        source_bytes = os.path.getsize(self.source_path)
+        with self.phase('count', source_bytes, chunk_size=chunk_size):
+            char_freq, pair_freq, n_chars, last_char = self.count_stream(chunk_size)
+        total_pairs = max(n_chars - 1, 0)
+        print(f"Количество символов в тексте: {n_chars}")
+        print(f"Общее количество пар: {total_pairs}, уникальных пар: {len(pair_freq)}\n")
+
+        with self.phase('build_codes', symbols=len(char_freq) + len(pair_freq)):
+            char_codes = self.make_codes(char_freq, n_chars)
+            pair_codes = self.make_codes(pair_freq, total_pairs)
+        with self.phase('write_csv'):
+            self.io.save_char_stats('char_stats.csv', char_freq, n_chars)
+            self.io.save_pair_stats('pair_stats.csv', pair_freq, total_pairs)
+            self.io.save_char_codes('char_codes.csv', char_codes, char_freq, n_chars)
+            self.io.save_pair_codes('pair_codes.csv', pair_codes, pair_freq, total_pairs)
+        print("Статистика и коды записаны в char_stats.csv, pair_stats.csv, char_codes.csv, pair_codes.csv")
+
+        char_chunks = self.io.iter_text(self.source_path, chunk_size)
+        with self.phase('encode', source_bytes, symbols='chars'):
+            if self.verify == 'crc':
+                encoded_chars_bits = self.io.encode_indexed('encoded_chars.bin', chain.from_iterable(char_chunks),
+                                                            char_codes, n_chars, canonical=self.canonical)
+            else:
+                encoded_chars_bits = self.io.encode_stream('encoded_chars.bin', char_chunks, char_codes,
+                                                           n_chars, canonical=self.canonical)
+        print(f"Текст закодирован символами. Длина битовой последовательности: {encoded_chars_bits} бит")
+
+        pair_count = n_chars // 2
+        remaining = last_char if n_chars % 2 else ''
+        pair_chunks = self.iter_block_chunks(chunk_size)
+        with self.phase('encode', source_bytes, symbols='pairs'):
+            if self.verify == 'crc':
+                encoded_pairs_bits = self.io.encode_indexed('encoded_pairs.bin', chain.from_iterable(pair_chunks),
+                                                            pair_codes, pair_count, remaining, self.canonical)
+            else:
+                encoded_pairs_bits = self.io.encode_stream('encoded_pairs.bin', pair_chunks, pair_codes,
+                                                           pair_count, remaining, self.canonical)
+        print(f"Текст закодирован парами символов. Длина битовой последовательности: {encoded_pairs_bits} бит")
+        print()
+
+        self.check_stream('encoded_chars.bin', 'decoded_chars.txt', chunk_size)
+        self.check_stream('encoded_pairs.bin', 'decoded_pairs.txt', chunk_size)
+
+        if encoded_pairs_bits:
+            print(f"\nКоэффициент сжатия: {encoded_chars_bits / encoded_pairs_bits}")
+
+
+def output_path(args, src, suffix):
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(args.output_dir or os.path.dirname(src) or '.', stem + suffix)
+
+
+def encode_streaming(codec, args, dst):
+    char_freq, pair_freq, n_chars, last_char = codec.count_stream(args.chunk_size)
+    if args.order == 1:
+        codes = codec.make_codes(char_freq, n_chars)
+    else:
+        codes = codec.make_codes(pair_freq, max(n_chars - 1, 0))
+    n_symbols = n_chars // args.order
+    tail = last_char if n_chars % args.order else ''
+    chunks = codec.iter_block_chunks(args.chunk_size, args.order)
+    if args.indexed:
+        nbits = codec.io.encode_indexed(dst, chain.from_iterable(chunks), codes, n_symbols, tail, codec.canonical,
+                                        block_size=args.block_size)
+    else:
+        nbits = codec.io.encode_stream(dst, chunks, codes, n_symbols, tail, codec.canonical)
+    return n_chars, nbits
+
+
+def encode_job(job):
+    make_codec, args, src = job
+    codec = make_codec(args, src)
+    dst = output_path(args, src, '.bin')
+    if args.streaming:
+        return (src, dst) + encode_streaming(codec, args, dst)
+    text = codec.io.load_text(src)
+    char_freq, pair_freq, char_codes, pair_codes = codec.build_tables(text, (args.order,))
+    codes = char_codes if args.order == 1 else pair_codes
+    n_symbols = len(text) // args.order
+    tail = text[n_symbols * args.order:]
+    if args.indexed:
+        nbits = codec.io.encode_indexed(dst, split_symbols(text, args.order), codes, n_symbols, tail, codec.canonical,
+                                        block_size=args.block_size)
+    else:
+        data, nbits = codec.pack_text(text, codes, args.order)
+        codec.io.save_encoded(dst, codes, data, nbits, n_symbols, tail, codec.canonical)
+    return src, dst, len(text), nbits
+
+
+def decode_job(job):
+    _, args, src = job
+    io = FileManager()
+    dst = output_path(args, src, '.decoded.txt')
+    with open(src, 'rb') as f:
+        magic = f.read(4)
+    if magic == io.INDEX_MAGIC:
+        text = io.decode_indexed(src)
+        io.write_text(dst, text)
+        n_chars = len(text)
+    else:
+        io.decode_stream(src, dst)
+        n_chars = sum(len(chunk) for chunk in io.iter_text(dst))
+    return src, dst, n_chars
+
+
+def stats_job(job):
+    make_codec, args, src = job
+    codec = make_codec(args, src)
+    text = codec.io.load_text(src)
+    n_chars = len(text)
+    total_pairs = max(n_chars - 1, 0)
+    char_freq, pair_freq, char_codes, pair_codes = codec.build_tables(text)
+    codec.io.save_char_stats(output_path(args, src, '_char_stats.csv'), char_freq, n_chars)
+    codec.io.save_char_codes(output_path(args, src, '_char_codes.csv'), char_codes, char_freq, n_chars)
+    codec.io.save_pair_stats(output_path(args, src, '_pair_stats.csv'), pair_freq, total_pairs)
+    codec.io.save_pair_codes(output_path(args, src, '_pair_codes.csv'), pair_codes, pair_freq, total_pairs)
+    return {'source': src, 'chars': n_chars, 'distinct_chars': len(char_freq), 'distinct_pairs': len(pair_freq),
+            'entropy': codec.entropy(char_freq, n_chars),
+            'pair_entropy': codec.entropy(pair_freq, total_pairs) if total_pairs else 0.0,
+            'avg_len': codec.average_length(char_freq, char_codes, n_chars) if n_chars else 0.0,
+            'pair_avg_len': codec.average_length(pair_freq, pair_codes, total_pairs) if total_pairs else 0.0}
+
+
+def expand_inputs(paths, extension):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.endswith(extension) and os.path.isfile(os.path.join(path, name)))
+        else:
+            files.append(path)
+    return files
+
+
+def find_collisions(args, files, suffix):
+    seen = {}
+    collisions = []
+    for src in files:
+        dst = os.path.abspath(output_path(args, src, suffix))
+        if dst in seen:
+            collisions.append((seen[dst], src, dst))
+        else:
+            seen[dst] = src
+    return collisions
+
+
+def run_job(job):
+    worker, make_codec, args, src = job
+    try:
+        return src, worker((make_codec, args, src)), None
+    except (OSError, ValueError, struct.error) as e:
+        return src, None, str(e)
+
+
+def run_jobs(worker, make_codec, args, files, failed):
+    jobs = [(worker, make_codec, args, src) for src in files]
+    if args.jobs <= 1 or len(jobs) <= 1:
+        pool = nullcontext()
+        results = map(run_job, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=args.jobs)
+        results = pool.map(run_job, jobs)
+    with pool:
+        for src, result, error in results:
+            if error is not None:
+                print(f"{src}: ошибка: {error}", file=sys.stderr)
+                failed.append(src)
+            else:
+                yield result
+
+
+def build_parser(description, source_commands=()):
+    parser = argparse.ArgumentParser(description=description)
+    commands = parser.add_subparsers(dest='command')
+    encode = commands.add_parser('encode', help='закодировать файлы')
+    decode = commands.add_parser('decode', help='декодировать файлы')
+    stats = commands.add_parser('stats', help='статистика и таблицы кодов')
+    for sub in (encode, decode, stats):
+        sub.add_argument('inputs', nargs='+', help='файлы или каталоги')
+        sub.add_argument('-o', '--output-dir', default=None, help='каталог для результатов')
+        sub.add_argument('--jobs', type=int, default=1, help='число файлов, обрабатываемых параллельно')
+    run = commands.add_parser('run', help='полный отчёт по одному тексту (по умолчанию)')
+    orders = commands.add_parser('orders', help='сравнение кодирования блоками по k символов')
+    context = commands.add_parser('context', help='кодирование с контекстом первого порядка')
+    indexed = commands.add_parser('indexed', help='блочный поток с индексом и произвольным доступом')
+    extra = [commands.add_parser(name, help=text) for name, text in source_commands]
+    for sub in [run, orders, context, indexed] + extra:
+        sub.add_argument('source', nargs='?', default='text.txt', help='исходный текст')
+        sub.add_argument('--jobs', type=int, default=1, help='число процессов')
+    for sub in (encode, stats, run, context, indexed):
+        sub.add_argument('--cache-dir', default=None, help='каталог кэша таблиц кодов')
+        sub.add_argument('--vectorized', action='store_true', help='подсчёт статистики через NumPy')
+    for sub in [orders] + extra:
+        sub.set_defaults(cache_dir=None, vectorized=False)
+    for sub in [encode, stats, run, orders, context, indexed] + extra:
+        sub.add_argument('--mmap', action='store_true', help='читать исходный файл через mmap')
+    for sub in (encode, run):
+        sub.add_argument('--streaming', action='store_true', help='потоковая обработка без загрузки файла в память')
+        sub.add_argument('--chunk-size', type=int, default=1 << 20)
+    for sub in (encode, indexed):
+        sub.add_argument('--block-size', type=int, default=1 << 16)
+    encode.add_argument('--order', type=int, choices=(1, 2), default=1, help='1 - символы, 2 - пары')
+    encode.add_argument('--indexed', action='store_true', help='блочный поток с индексом и CRC32')
+    run.add_argument('--verify', choices=('decode', 'crc', 'none'), default='decode', help='способ проверки')
+    for sub in (run, orders, context, indexed):
+        sub.add_argument('--metrics', default=None, help='JSON-файл для метрик по фазам')
+        sub.add_argument('--metrics-log', action='store_true', help='печатать метрики фаз в stderr')
+        sub.add_argument('--trace-allocations', action='store_true', help='учитывать выделения памяти (tracemalloc)')
+    orders.add_argument('--orders', type=int, nargs='+', default=[1, 2, 3], help='длины блоков')
+    return parser, commands
+
+
+def check_args(parser, args):
+    if getattr(args, 'streaming', False) and (args.cache_dir or args.vectorized):
+        parser.error("--cache-dir и --vectorized не поддерживаются вместе с --streaming")
+
+
+def run_source_command(args, make_codec):
+    options = {'jobs': args.jobs}
+    if args.command == 'run':
+        options['verify'] = args.verify
+    metrics = None
+    if args.metrics or args.metrics_log or args.trace_allocations:
+        metrics = options['metrics'] = Metrics(args.metrics, args.metrics_log, args.trace_allocations)
+    codec = make_codec(args, args.source, **options)
+    try:
+        if args.command == 'run' and args.streaming:
+            codec.run_streaming(args.chunk_size)
+        elif args.command == 'run':
+            codec.run()
+        elif args.command == 'orders':
+            codec.run_orders(tuple(args.orders))
+        elif args.command == 'context':
+            codec.run_context()
+        else:
+            codec.run_indexed(args.block_size)
+    finally:
+        if metrics is not None and metrics.path:
+            metrics.save()
+
+
+def run_command(args, make_codec, encode_worker=encode_job, decode_worker=decode_job):
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    failed = []
+    extension, suffix = {'encode': ('.txt', '.bin'), 'decode': ('.bin', '.decoded.txt'),
+                         'stats': ('.txt', '_char_stats.csv')}[args.command]
+    files = expand_inputs(args.inputs, extension)
+    collisions = find_collisions(args, files, suffix)
+    for first, second, dst in collisions:
+        print(f"{second}: ошибка: результат {dst} уже записывается для {first}", file=sys.stderr)
+    if collisions:
+        sys.exit(1)
+    if args.command == 'encode':
+        for src, dst, n_chars, nbits in run_jobs(encode_worker, make_codec, args, files, failed):
+            print(f"{src} -> {dst}: {n_chars} символов, {nbits} бит, "
+                  f"{nbits / n_chars if n_chars else 0.0:.4f} бит на символ")
+    elif args.command == 'decode':
+        for src, dst, n_chars in run_jobs(decode_worker, make_codec, args, files, failed):
+            print(f"{src} -> {dst}: {n_chars} символов")
+    else:
+        for result in run_jobs(stats_job, make_codec, args, files, failed):
+            print(json.dumps(result, ensure_ascii=False))
+    print(f"Обработано файлов: {len(files) - len(failed)} из {len(files)} за {time.perf_counter() - t0:.2f} с",
+          file=sys.stderr)
+    if failed:
+        sys.exit(1)